@@ -0,0 +1,106 @@
+"""
+Authenticated requests/sec through the orchestrator's auth dependency.
+
+    python -m benchmarks.auth_throughput --concurrency 64 --seconds 5 --logins 8
+
+"sync" is the previous path (a sync dependency opening a SQLModel Session per
+request on the thread pool); "async" is the current one (async session behind
+the verified-token cache). With --logins, that many clients hammer /auth/login
+during each run, to show how bcrypt load affects authenticated traffic.
+Runs in-process over ASGI against a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "auth_bench.db")
+
+import httpx
+import jwt
+from fastapi import Depends, Header
+from sqlmodel import Session
+
+from common.config import settings
+from services.orchestrator.auth import token_cache
+from services.orchestrator.db import engine
+from services.orchestrator.main import app, get_current_user
+from services.orchestrator.models import User
+
+
+def sync_current_user(authorization: str | None = Header(None)):
+    payload = jwt.decode(authorization.split(" ", 1)[1], settings.JWT_SECRET, algorithms=["HS256"])
+    with Session(engine) as s:
+        return s.get(User, int(payload.get("sub")))
+
+
+@app.get("/bench/sync")
+def bench_sync(user=Depends(sync_current_user)):
+    return {"id": user.id}
+
+
+@app.get("/bench/async")
+async def bench_async(user=Depends(get_current_user)):
+    return {"id": user.id}
+
+
+async def run(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int, seconds: float, logins: int):
+    latencies = []
+    stop = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    async def login_loop():
+        while time.perf_counter() < stop:
+            await client.post("/auth/login", json={"email": "bench@example.com", "password": "bench-password"})
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)], *[login_loop() for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def bench(args) -> dict:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        r = await client.post("/auth/register", json={"email": "bench@example.com", "password": "bench-password"})
+        r.raise_for_status()
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+        results = {}
+        for name in ("sync", "async"):
+            await run(client, f"/bench/{name}", headers, args.concurrency, 0.5, 0)  # warm-up
+            results[name] = await run(client, f"/bench/{name}", headers, args.concurrency, args.seconds, args.logins)
+            print(name, json.dumps(results[name]))
+        results["token_cache"] = token_cache.stats()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--logins", type=int, default=0, help="concurrent clients logging in during each run")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
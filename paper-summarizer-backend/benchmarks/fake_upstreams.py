@@ -0,0 +1,176 @@
+"""
+Local stand-ins for Semantic Scholar, arXiv and Cosmos RP, for load tests.
+
+    python -m benchmarks.fake_upstreams --port 9100 --latency-ms 80 --jitter-ms 20 --error-rate 0.01 --rate-limit 100
+
+Point the services at it with
+    SEMANTIC_SCHOLAR_URL=http://127.0.0.1:9100/graph/v1
+    ARXIV_API_URL=http://127.0.0.1:9100/api/query
+    COSMO_RP_URL=http://127.0.0.1:9100/v1/chat/completions
+
+Every response is delayed by latency +/- jitter; a fraction `error-rate` of
+requests fails with 500; past `rate-limit` requests/s per upstream the server
+answers 429 with Retry-After, like the real APIs do. Results are generated
+deterministically from the query, so the same query always returns the same
+papers.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from xml.sax.saxutils import escape
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+WORDS = (
+    "model attention graph network training data transformer retrieval language learning representation "
+    "inference latency benchmark dataset evaluation optimization sparse dense embedding generation task "
+    "robust efficient scalable neural method approach results performance analysis framework system"
+).split()
+
+
+def _rng(*parts) -> random.Random:
+    return random.Random(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest())
+
+
+def fake_papers(query: str, limit: int) -> list:
+    papers = []
+    for i in range(limit):
+        rng = _rng(query, i)
+        pid = hashlib.sha1(f"{query}|{i}".encode()).hexdigest()[:16]
+        arxiv_id = f"{rng.randint(1501, 2412)}.{rng.randint(0, 99999):05d}"
+        abstract = " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 20))).capitalize() + "."
+            for _ in range(rng.randint(5, 9))
+        )
+        papers.append({
+            "paperId": pid,
+            "title": f"{query.title()}: {' '.join(rng.choice(WORDS) for _ in range(4))} ({i + 1})",
+            "abstract": abstract,
+            "authors": [{"name": f"{rng.choice('ABCDEFGHJKLMNPRS')}. Author{rng.randint(1, 999)}"} for _ in range(rng.randint(1, 5))],
+            "year": rng.randint(2015, 2025),
+            "url": f"https://www.semanticscholar.org/paper/{pid}",
+            "externalIds": {"ArXiv": arxiv_id, "DOI": f"10.48550/arXiv.{arxiv_id}"},
+        })
+    return papers
+
+
+def atom_feed(papers: list) -> str:
+    entries = []
+    for p in papers:
+        arxiv_id = p["externalIds"]["ArXiv"]
+        authors = "".join(f"<author><name>{escape(a['name'])}</name></author>" for a in p["authors"])
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/{arxiv_id}v1</id><published>{p['year']}-01-01T00:00:00Z</published>"
+            f"<title>{escape(p['title'])}</title><summary>{escape(p['abstract'])}</summary>{authors}"
+            f'<link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/></entry>'
+        )
+    return '<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">' + "".join(entries) + "</feed>"
+
+
+class RateLimiter:
+    """Token bucket per upstream; rate <= 0 disables it."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)  # a rate below 1/s still admits one request at a time
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """0 if admitted, otherwise seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def create_app(latency_ms: float = 50, jitter_ms: float = 10, error_rate: float = 0.0,
+               rate_limit: float = 0.0, token_ms: float = 5, answer_tokens: int = 60) -> FastAPI:
+    app = FastAPI(title="Fake upstreams")
+    limiters = {name: RateLimiter(rate_limit) for name in ("semantic_scholar", "arxiv", "cosmos_rp")}
+    counts = {name: {} for name in limiters}
+
+    async def gate(name: str):
+        """Latency, rate limiting and injected errors; returns an error response or None."""
+        wait = limiters[name].acquire()
+        if wait:
+            status = 429
+        elif random.random() < error_rate:
+            status = 500
+        else:
+            status = 200
+        counts[name][status] = counts[name].get(status, 0) + 1
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+        if status == 429:
+            return JSONResponse({"message": "Too Many Requests"}, status_code=429,
+                                headers={"Retry-After": str(max(1, round(wait)))})
+        if status == 500:
+            return JSONResponse({"message": "injected failure"}, status_code=500)
+        return None
+
+    @app.get("/graph/v1/paper/search")
+    async def semantic_scholar(query: str, limit: int = 10):
+        return await gate("semantic_scholar") or {"total": limit, "data": fake_papers(query, limit)}
+
+    @app.get("/api/query")
+    async def arxiv(search_query: str, max_results: int = 10):
+        error = await gate("arxiv")
+        if error:
+            return error
+        query = search_query.split(":", 1)[-1]
+        return Response(atom_feed(fake_papers(query, max_results)), media_type="application/atom+xml")
+
+    @app.post("/v1/chat/completions")
+    async def cosmos_rp(request: Request):
+        error = await gate("cosmos_rp")
+        if error:
+            return error
+        body = await request.json()
+        question = body["messages"][-1]["content"] if body.get("messages") else ""
+        rng = _rng(question)
+        tokens = [rng.choice(WORDS) + " " for _ in range(min(answer_tokens, body.get("max_tokens", answer_tokens)))]
+        if not body.get("stream"):
+            await asyncio.sleep(token_ms * len(tokens) / 1000)
+            return {"choices": [{"message": {"role": "assistant", "content": "".join(tokens)}}]}
+
+        async def sse():
+            for token in tokens:
+                await asyncio.sleep(token_ms / 1000)
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return counts
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/s per upstream before 429 (0 = off)")
+    parser.add_argument("--token-ms", type=float, default=5, help="Cosmos RP delay per generated token")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit, args.token_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
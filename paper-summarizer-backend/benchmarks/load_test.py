@@ -0,0 +1,291 @@
+"""
+Load-test the agents and the orchestrator and report throughput and latency percentiles.
+
+    # everything local: fake upstreams + all four services with the stub summarizer
+    python -m benchmarks.load_test --spawn --concurrency 32 --seconds 20 --output run.json
+
+    # against services you started yourself
+    python -m benchmarks.load_test --targets search cite --orchestrator-url http://localhost:8000 ...
+
+With --spawn, the services run as subprocesses in a scratch directory with
+SUMMARIZER_BACKEND=stub and their upstream URLs pointed at
+benchmarks.fake_upstreams, whose latency, error rate and rate limit are set
+by the --upstream-* options. Every request uses a fresh query or text, so
+the caches don't hide the work. Results are written as JSON so runs can be
+diffed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from .fake_upstreams import fake_papers
+
+TARGETS = ("search", "summarize", "cite", "chat")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: List[float], statuses: Dict[int, int], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = sum(statuses.values()) + errors
+    ok = sum(n for status, n in statuses.items() if status < 400)
+    return {
+        "requests": total,
+        "ok": ok,
+        "failed": total - ok,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "transport_errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": ok / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+    }
+
+
+def fresh_query(i: int) -> str:
+    return f"efficient retrieval {uuid.uuid4().hex[:8]} {i}"
+
+
+def make_request_factory(target: str, urls: Dict[str, str], limit: int, headers: dict) -> Callable[[int], tuple]:
+    """Returns i -> (method, url, json body, headers) for the i-th request against `target`."""
+    if target == "search":
+        return lambda i: ("POST", urls["search"] + "/search", {"query": fresh_query(i), "limit": limit}, {})
+    if target == "summarize":
+        return lambda i: ("POST", urls["summarizer"] + "/summarize",
+                          {"text": fake_papers(fresh_query(i), 1)[0]["abstract"]}, {})
+    if target == "cite":
+        def cite(i):
+            papers = [
+                {"id": p["paperId"], "title": p["title"], "year": p["year"], "url": p["url"],
+                 "authors": [a["name"] for a in p["authors"]], "arxiv_id": p["externalIds"]["ArXiv"]}
+                for p in fake_papers(fresh_query(i), limit)
+            ]
+            return "POST", urls["citation"] + "/cite", {"papers": papers}, {}
+        return cite
+    if target == "chat":
+        return lambda i: ("POST", urls["orchestrator"] + "/api/chat", {"query": fresh_query(i), "limit": limit}, headers)
+    raise ValueError(target)
+
+
+async def drive(client: httpx.AsyncClient, factory, concurrency: int, seconds: Optional[float],
+                requests: Optional[int]) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    counter = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    stop_at = started + seconds if seconds else None
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if requests is not None and i >= requests:
+                return
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return
+            method, url, body, headers = factory(i)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, url, json=body, headers=headers)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                if r.status_code < 400:
+                    latencies.append(time.perf_counter() - t0)
+            except httpx.HTTPError:
+                errors += 1
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize_latencies(latencies, statuses, errors, time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient, orchestrator_url: str) -> dict:
+    creds = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password"}
+    r = await client.post(orchestrator_url + "/auth/register", json=creds)
+    r.raise_for_status()
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+async def run(args, urls: Dict[str, str]) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        headers = await login(client, urls["orchestrator"]) if "chat" in args.targets else {}
+        results = {}
+        for target in args.targets:
+            factory = make_request_factory(target, urls, args.limit, headers)
+            if args.warmup:
+                await drive(client, factory, min(args.concurrency, args.warmup), None, args.warmup)
+            results[target] = await drive(client, factory, args.concurrency, args.seconds, args.requests)
+            lat = results[target]["latency_ms"]
+            print(f"{target:10s} {results[target]['throughput_rps']:8.1f} req/s  "
+                  f"p50 {lat['p50']:7.1f} ms  p95 {lat['p95']:7.1f} ms  p99 {lat['p99']:7.1f} ms  "
+                  f"failed {results[target]['failed']}")
+        if "chat" in args.targets:
+            # answer cache, prefetch hit rate, upstream breakers etc. after the run
+            r = await client.get(urls["orchestrator"] + "/stats")
+            if r.status_code == 200:
+                results["orchestrator_stats"] = r.json()
+        return results
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+@contextmanager
+def spawn_stack(args):
+    """Fake upstreams plus the four services, each a subprocess; yields their base URLs."""
+    base = args.port_base
+    ports = {"orchestrator": base, "search": base + 1, "summarizer": base + 2, "citation": base + 3, "upstreams": base + 9}
+    urls = {name: f"http://127.0.0.1:{port}" for name, port in ports.items()}
+    workdir = tempfile.mkdtemp(prefix="paper-bench-")
+    env = {
+        # no client-side throttling unless asked for; the fake upstreams enforce --upstream-rate-limit
+        "SEMANTIC_SCHOLAR_RATE": "0",
+        "ARXIV_RATE": "0",
+        # every request reaches the pipeline; set HISTORY_REUSE_SECONDS to measure answer reuse
+        "HISTORY_REUSE_SECONDS": "0",
+        **os.environ,
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "SEMANTIC_SCHOLAR_API_KEY": "",
+        "HUGGINGFACE_API_KEY": "",
+        "JWT_SECRET": "benchmark-secret-benchmark-secret",
+        "DATABASE_URL": f"sqlite:///{workdir}/orchestrator.db",
+        "COSMO_RP_URL": urls["upstreams"] + "/v1/chat/completions",
+        "COSMO_RP_KEY": "benchmark",
+        "SEMANTIC_SCHOLAR_URL": urls["upstreams"] + "/graph/v1",
+        "ARXIV_API_URL": urls["upstreams"] + "/api/query",
+        "SEARCH_AGENT_URL": urls["search"],
+        "SUMMARIZER_AGENT_URL": urls["summarizer"],
+        "CITATION_AGENT_URL": urls["citation"],
+        "SUMMARIZER_BACKEND": "stub",
+        "SUMMARY_CACHE_PATH": f"{workdir}/summary_cache.db",
+        "PAPER_STORE_PATH": f"{workdir}/papers.db" if args.library else "",
+        "PAPER_INDEX_DIR": f"{workdir}/paper_index",
+    }
+    commands = {
+        "upstreams": [sys.executable, "-m", "benchmarks.fake_upstreams", "--port", str(ports["upstreams"]),
+                      "--latency-ms", str(args.upstream_latency_ms), "--jitter-ms", str(args.upstream_jitter_ms),
+                      "--error-rate", str(args.upstream_error_rate), "--rate-limit", str(args.upstream_rate_limit),
+                      "--token-ms", str(args.upstream_token_ms)],
+        "search": ["services.search_agent.main:app"],
+        "summarizer": ["services.summarizer_agent.main:app"],
+        "citation": ["services.citation_agent.main:app"],
+        "orchestrator": ["services.orchestrator.main:app"],
+    }
+    ready_paths = {"upstreams": "/stats", "summarizer": "/readyz"}
+    procs = {}
+    try:
+        for name, cmd in commands.items():
+            if name != "upstreams":
+                cmd = [sys.executable, "-m", "uvicorn", cmd[0], "--host", "127.0.0.1", "--port", str(ports[name]),
+                       "--log-level", "warning"]
+            procs[name] = subprocess.Popen(cmd, cwd=workdir, env=env)
+        for name, proc in procs.items():
+            _wait_ready(urls[name] + ready_paths.get(name, "/metrics"), proc)
+        yield urls
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10, help="duration per target")
+    parser.add_argument("--requests", type=int, help="stop after this many requests per target instead")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per target first")
+    parser.add_argument("--limit", type=int, default=5, help="papers per search / chat / cite request")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="write results as JSON")
+
+    parser.add_argument("--orchestrator-url", default="http://localhost:8000")
+    parser.add_argument("--search-url", default="http://localhost:8001")
+    parser.add_argument("--summarizer-url", default="http://localhost:8002")
+    parser.add_argument("--citation-url", default="http://localhost:8003")
+
+    parser.add_argument("--spawn", action="store_true", help="start fake upstreams and all services locally")
+    parser.add_argument("--port-base", type=int, default=18000, help="--spawn: orchestrator port; agents follow")
+    parser.add_argument("--library", action="store_true", help="--spawn: enable the search agent's paper store")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=10)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-rate-limit", type=float, default=0.0, help="req/s per upstream, 0 = unlimited")
+    parser.add_argument("--upstream-token-ms", type=float, default=5)
+    args = parser.parse_args()
+    if args.requests:
+        args.seconds = None
+
+    def execute(urls):
+        return asyncio.run(run(args, urls))
+
+    if args.spawn:
+        with spawn_stack(args) as urls:
+            results = execute(urls)
+    else:
+        results = execute({
+            "orchestrator": args.orchestrator_url, "search": args.search_url,
+            "summarizer": args.summarizer_url, "citation": args.citation_url,
+        })
+
+    report = {
+        "timestamp": time.time(),
+        "revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Per-hop CPU cost of moving `Paper` lists between the services.
+
+    python -m benchmarks.serialization --sizes 10 100 500 --repeat 50
+
+For each result size, times the encode/decode work done on each hop of
+/api/chat (no network), for three wire paths:
+
+    legacy   json module, model.dict() per paper, FastAPI's jsonable_encoder on responses
+    json     orjson, paper lists dumped in one pydantic-core pass, responses encoded directly (INTERNAL_WIRE_FORMAT=json)
+    msgpack  the same with msgpack bodies (INTERNAL_WIRE_FORMAT=msgpack)
+
+and the body size in bytes. Papers come from benchmarks.fake_upstreams, so
+abstracts have realistic lengths. Decoding still validates: with pydantic v2,
+Paper(**p) measured faster than Paper.model_construct(**p), so skipping
+validation on trusted hops would not pay off.
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+
+from common import wire
+from common.schemas import CitationRequest, Paper, SearchResponse
+
+from .fake_upstreams import fake_papers
+
+HOPS = ("search_response", "orchestrator_parse", "cite_request", "cite_parse", "chat_response")
+
+
+def make_papers(n: int) -> list:
+    return [
+        Paper(id=p["paperId"], title=p["title"], abstract=p["abstract"], year=p["year"], url=p["url"],
+              authors=[a["name"] for a in p["authors"]], arxiv_id=p["externalIds"]["ArXiv"], external_ids=p["externalIds"])
+        for p in fake_papers("serialization benchmark", n)
+    ]
+
+
+def legacy_hops(papers: list) -> Dict[str, Callable[[], object]]:
+    search_body = json.dumps(jsonable_encoder(SearchResponse(papers=papers))).encode()
+    cite_body = json.dumps({"papers": [p.dict() for p in papers]}).encode()
+    result = {"query": "q", "papers": [p.dict() for p in papers], "summaries": [], "citations": [], "chat_response": ""}
+    return {
+        "search_response": lambda: json.dumps(jsonable_encoder(SearchResponse(papers=papers))).encode(),
+        "orchestrator_parse": lambda: [Paper(**p) for p in json.loads(search_body)["papers"]],
+        "cite_request": lambda: json.dumps({"papers": [p.dict() for p in papers]}).encode(),
+        "cite_parse": lambda: CitationRequest(**json.loads(cite_body)),
+        "chat_response": lambda: json.dumps(jsonable_encoder(result)).encode(),
+    }
+
+
+def wire_hops(papers: list, media_type: str) -> Dict[str, Callable[[], object]]:
+    search_body = wire.dumps({"papers": wire.dump_papers(papers)}, media_type)
+    cite_body = search_body
+    result = {"query": "q", "papers": wire.dump_papers(papers), "summaries": [], "citations": [], "chat_response": ""}
+    return {
+        "search_response": lambda: wire.dumps({"papers": wire.dump_papers(papers)}, media_type),
+        "orchestrator_parse": lambda: [Paper(**p) for p in wire.loads(search_body, media_type)["papers"]],
+        "cite_request": lambda: wire.dumps({"papers": wire.dump_papers(papers)}, media_type),
+        "cite_parse": lambda: CitationRequest(**wire.loads(cite_body, media_type)),
+        "chat_response": lambda: wire.dumps(result, media_type),
+    }
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Fastest of `repeat` runs, in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def bench(sizes, repeat: int) -> dict:
+    modes = {"legacy": legacy_hops, "json": lambda p: wire_hops(p, wire.JSON)}
+    if wire.msgpack is not None:
+        modes["msgpack"] = lambda p: wire_hops(p, wire.MSGPACK)
+    results = {}
+    for n in sizes:
+        papers = make_papers(n)
+        results[n] = {}
+        for mode, build in modes.items():
+            hops = build(papers)
+            timings = {hop: best_of(hops[hop], repeat) for hop in HOPS}
+            body = hops["search_response"]()
+            results[n][mode] = {"us": timings, "total_us": sum(timings.values()), "search_body_bytes": len(body)}
+        base = results[n]["legacy"]["total_us"]
+        print(f"--- {n} papers")
+        for mode, r in results[n].items():
+            hops = "  ".join(f"{hop} {r['us'][hop]:8.0f}" for hop in HOPS)
+            print(f"{mode:8s} total {r['total_us']:9.0f} us ({base / r['total_us']:4.1f}x)  "
+                  f"body {r['search_body_bytes']:8d} B  {hops}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if wire.orjson is None:
+        print("orjson not installed: the json path uses the json module")
+    results = bench(args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
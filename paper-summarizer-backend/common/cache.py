@@ -0,0 +1,104 @@
+# common/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from common.telemetry import CACHE_LOOKUPS
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded LRU map with optional per-entry expiry and lookup counters, the
+    piece every service cache is built on. Lookups are counted under
+    `name` in the cache_lookups_total metric, and stats() reports them the
+    same way everywhere.
+
+    Not thread-safe: caches shared with worker threads hold their own lock
+    around it. `on_drop(key, value)` is called when an entry expires or is
+    evicted (not when it is popped).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        name: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_drop: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.name = name
+        self.clock = clock
+        self.on_drop = on_drop
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self.lookups: Dict[str, int] = {}  # result ("hit", "miss", "coalesced", ...) -> count
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, result: str):
+        """Count one lookup; anything but "miss" counts as a hit."""
+        self.lookups[result] = self.lookups.get(result, 0) + 1
+        if self.name:
+            CACHE_LOOKUPS.labels(self.name, result).inc()
+
+    @property
+    def misses(self) -> int:
+        return self.lookups.get("miss", 0)
+
+    @property
+    def hits(self) -> int:
+        return sum(self.lookups.values()) - self.misses
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        if self.on_drop:
+            self.on_drop(key, value)
+
+    def peek(self, key, default=None):
+        """The live value without counting a lookup or refreshing its recency."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] is not None and entry[0] < self.clock():
+            self._drop(key)
+            return default
+        return entry[1]
+
+    def get(self, key, default=None, count: bool = True):
+        value = self.peek(key, _MISSING)
+        if value is _MISSING:
+            if count:
+                self.record("miss")
+            return default
+        self._entries.move_to_end(key)
+        if count:
+            self.record("hit")
+        return value
+
+    def put(self, key, value, ttl: Optional[float] = None, expires: Optional[float] = None):
+        """Insert or replace; expires after `ttl` seconds or at `expires` (on the cache's clock), if given."""
+        if ttl is not None:
+            expires = self.clock() + ttl
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def stats(self) -> dict:
+        lookups = sum(self.lookups.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -13,6 +13,134 @@ class Settings(BaseSettings):
     SEARCH_AGENT_URL: str = "http://localhost:8001"
     SUMMARIZER_AGENT_URL: str = "http://localhost:8002"
     CITATION_AGENT_URL: str = "http://localhost:8003"
+    # Upstream APIs (overridable, e.g. to point at benchmarks.fake_upstreams)
+    SEMANTIC_SCHOLAR_URL: str = "https://api.semanticscholar.org/graph/v1"
+    ARXIV_API_URL: str = "http://export.arxiv.org/api/query"
+
+    # Shared outbound HTTP client (timeouts in seconds)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30
+    HTTP2_ENABLED: bool = True
+    HTTP_DEFAULT_TIMEOUT: float = 30
+    SEMANTIC_SCHOLAR_TIMEOUT: float = 20
+    ARXIV_TIMEOUT: float = 20
+    COSMO_RP_TIMEOUT: float = 60
+    AGENT_TIMEOUT: float = 60
+
+    # Outbound scheduler (common.scheduler): per-upstream token buckets (requests/s, 0 = unlimited),
+    # jittered retries on 429/5xx and circuit breakers
+    SEMANTIC_SCHOLAR_RATE: float = 1.0
+    SEMANTIC_SCHOLAR_BURST: int = 5
+    ARXIV_RATE: float = 1.0
+    ARXIV_BURST: int = 3
+    COSMO_RP_RATE: float = 0
+    COSMO_RP_BURST: int = 10
+    UPSTREAM_MAX_RETRIES: int = 2
+    UPSTREAM_QUEUE_TIMEOUT: float = 10  # longest a call waits for tokens and retries before giving up
+    UPSTREAM_BACKOFF_BASE_MS: float = 200
+    UPSTREAM_BACKOFF_MAX_MS: float = 5000
+    BREAKER_FAILURES: int = 5  # consecutive failed calls before the breaker opens
+    BREAKER_RESET_SECONDS: float = 30
+
+    # Per-stage deadlines for /api/chat (seconds)
+    PIPELINE_SEARCH_DEADLINE: float = 30
+    PIPELINE_SUMMARIZE_DEADLINE: float = 45
+    PIPELINE_CITE_DEADLINE: float = 10
+    PIPELINE_CHAT_DEADLINE: float = 60
+
+    # Summarizer micro-batching
+    SUMMARIZER_MODEL: str = "facebook/bart-large-cnn"
+    SUMMARIZER_BACKEND: str = "pytorch"  # pytorch | quantized | onnx | stub (benchmarks, no model)
+    SUMMARIZER_STUB_BATCH_MS: float = 20  # stub backend: simulated cost per batch...
+    SUMMARIZER_STUB_ITEM_MS: float = 5  # ...and per text in the batch
+    SUMMARIZER_ONNX_DIR: str = "./models/bart-large-cnn-onnx"
+    SUMMARIZER_INTRA_OP_THREADS: int = 0  # 0 = library default
+    SUMMARIZER_INTER_OP_THREADS: int = 0
+    SUMMARIZER_MODEL_CACHE_DIR: str = ""  # "" = Hugging Face default cache
+    SUMMARIZER_LOCAL_FILES_ONLY: bool = False
+    SUMMARIZER_LOAD_MODE: str = "background"  # eager | background | lazy (first request)
+    SUMMARIZER_WARMUP: bool = False
+    SUMMARIZER_MAX_BATCH_SIZE: int = 8
+    SUMMARIZER_MAX_WAIT_MS: int = 10
+    SUMMARIZER_REPLICAS: int = 0  # >0 runs that many model replicas in worker processes
+    SUMMARIZER_CONCURRENCY: int = 0  # batches in flight; 0 = one per replica
+    SUMMARIZER_MAX_QUEUE: int = 256  # waiting jobs before 503; 0 = unbounded
+
+    # Long-document (map-reduce) summarization, in model tokens
+    SUMMARIZER_CHUNK_TOKENS: int = 900
+    SUMMARIZER_CHUNK_OVERLAP: int = 64
+    SUMMARIZER_MAX_REDUCE_DEPTH: int = 3
+
+    # Summary cache ("" disables the on-disk tier)
+    SUMMARY_CACHE_SIZE: int = 2048
+    SUMMARY_CACHE_PATH: str = "./summary_cache.db"
+    SUMMARY_CACHE_FLUSH_MS: int = 200  # disk writes are batched this often, off the event loop
+
+    # Search result cache (seconds)
+    SEARCH_CACHE_SIZE: int = 1024
+    SEARCH_CACHE_TTL: float = 600
+    SEARCH_CACHE_NEGATIVE_TTL: float = 30
+
+    # "sequential" (arXiv only after Semantic Scholar fails) or "hedged" (arXiv too once Semantic
+    # Scholar has taken this long, first source with papers wins)
+    SEARCH_STRATEGY: str = "sequential"
+    SEARCH_HEDGE_DELAY_MS: int = 300
+
+    # Local paper store + embedding index ("" store path disables it)
+    PAPER_STORE_PATH: str = "./papers.db"
+    PAPER_INDEX_DIR: str = "./paper_index"
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = 64
+    LOCAL_SEARCH_FIRST: bool = True
+    LOCAL_SEARCH_MIN_SCORE: float = 0.55
+    SEARCH_RERANK: bool = True
+    # Answer only from the local store (e.g. seeded by services.search_agent.ingest), never upstream
+    SEARCH_OFFLINE: bool = False
+    # k in reciprocal rank fusion (mode="fused"); larger flattens the rank weighting
+    SEARCH_RRF_K: int = 60
+
+    # Orchestrator auth: verified-token cache and bcrypt worker threads
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 300
+    AUTH_HASH_WORKERS: int = 2
+
+    # Orchestrator chat history: reuse a user's identical answer for this many seconds (0 = never),
+    # written off the request path in batches
+    HISTORY_ENABLED: bool = True
+    HISTORY_REUSE_SECONDS: float = 600
+    HISTORY_BATCH_SIZE: int = 100
+    HISTORY_FLUSH_MS: int = 200
+    HISTORY_QUEUE_SIZE: int = 10000
+
+    # Citation agent: memoized formatted citations, and papers per streamed export chunk
+    CITATION_CACHE_SIZE: int = 10000
+    CITATION_EXPORT_CHUNK: int = 200
+
+    # Orchestrator chat prompt: compact serializer with the papers/summaries trimmed to this many
+    # (estimated) tokens, and a cache of Cosmos RP answers by query + paper/summary ids (TTL 0 = off)
+    CHAT_COMPACT_PROMPT: bool = True
+    CHAT_PROMPT_TOKEN_BUDGET: int = 1500
+    CHAT_ANSWER_CACHE_SIZE: int = 2048
+    CHAT_ANSWER_CACHE_TTL: float = 3600
+
+    # Bodies between the orchestrator and the search/citation agents: "json" (orjson when installed)
+    # or "msgpack"; switch to msgpack only once every agent runs a version that accepts it
+    INTERNAL_WIRE_FORMAT: str = "json"
+
+    # Orchestrator prefetch: precompute search/summaries/citations for trending (decayed score >= min)
+    # and recent queries while no more than PREFETCH_MAX_LIVE chats are in flight, using at most
+    # PREFETCH_BUDGET of wall time
+    PREFETCH_ENABLED: bool = True
+    PREFETCH_INTERVAL: float = 30
+    PREFETCH_TTL: float = 900
+    PREFETCH_TOP_K: int = 10
+    PREFETCH_RECENT_K: int = 5
+    PREFETCH_MIN_SCORE: float = 2
+    PREFETCH_BUDGET: float = 0.1
+    PREFETCH_MAX_LIVE: int = 0
+    PREFETCH_CACHE_SIZE: int = 500
+    PREFETCH_HALF_LIFE: float = 3600
 
     class Config:
         env_file = ".env"
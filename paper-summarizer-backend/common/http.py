@@ -0,0 +1,44 @@
+import httpx
+from common.config import settings
+from common.telemetry import REQUEST_ID_HEADER, current_request_id
+
+# One pooled client per process, created/closed by each service's lifespan
+_client: httpx.AsyncClient | None = None
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+async def _forward_request_id(request: httpx.Request):
+    request_id = current_request_id()
+    if request_id and REQUEST_ID_HEADER not in request.headers:
+        request.headers[REQUEST_ID_HEADER] = request_id
+
+async def start_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            http2=settings.HTTP2_ENABLED and _http2_available(),
+            timeout=settings.HTTP_DEFAULT_TIMEOUT,
+            event_hooks={"request": [_forward_request_id]},
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("HTTP client not started; call start_client() in the app lifespan")
+    return _client
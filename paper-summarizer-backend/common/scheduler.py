@@ -0,0 +1,247 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from common.config import settings
+from common.telemetry import BREAKER_STATE, UPSTREAM_RETRIES, UPSTREAM_TOKENS
+
+# Worth another attempt: rate limited, or the upstream (or a proxy) failed
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """The call was not attempted: the breaker is open or no rate-limit token came up before the deadline."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 0.0):
+        super().__init__(f"{upstream} unavailable ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    `rate` requests/s with bursts up to `burst`; rate <= 0 means unlimited.
+    Waiters take tokens by reservation (the level may go negative), so they
+    are served in arrival order without a lock.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def level(self) -> float:
+        if self.rate <= 0:
+            return float(self.burst)
+        self._refill(time.monotonic())
+        return self.tokens
+
+    def pause(self, seconds: float):
+        """Upstream said Retry-After: hand out no tokens until then."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, deadline: float, name: str):
+        now = time.monotonic()
+        start = max(now, self.paused_until)
+        if self.rate <= 0:
+            wait = start - now
+        else:
+            self._refill(now)
+            wait = max(start - now, (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0)
+        if now + wait > deadline:
+            raise UpstreamUnavailable(name, "rate limited", retry_after=wait)
+        if self.rate > 0:
+            self.tokens -= 1
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed calls and rejects calls for
+    `reset_seconds`; then lets a single probe through (half-open), closing
+    again if it succeeds.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = max(1, failures)
+        self.reset_seconds = reset_seconds
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.consecutive += 1
+        if self.probing or self.consecutive >= self.failures:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class Upstream:
+    """Token bucket + retries + circuit breaker in front of one upstream API."""
+
+    def __init__(self, name: str, rate: float, burst: int, queue_timeout: float):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(settings.BREAKER_FAILURES, settings.BREAKER_RESET_SECONDS)
+        self.queue_timeout = queue_timeout
+        UPSTREAM_TOKENS.labels(name).set_function(self.bucket.level)
+        BREAKER_STATE.labels(name).set_function(lambda: {"closed": 0, "half_open": 1, "open": 2}[self.breaker.state])
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]."""
+        cap = min(settings.UPSTREAM_BACKOFF_MAX_MS, settings.UPSTREAM_BACKOFF_BASE_MS * 2 ** attempt)
+        return random.uniform(0, cap) / 1000
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]], deadline: Optional[float] = None) -> httpx.Response:
+        """
+        Run `send` (which must build a fresh request each time) under the
+        upstream's rate limit, retrying 429/5xx and transport errors with
+        jittered backoff, or after Retry-After when given. Returns the last
+        response, leaving raise_for_status to the caller, and raises
+        UpstreamUnavailable instead of calling while the breaker is open.
+        `deadline` is a time.monotonic() value; it defaults to now + queue_timeout.
+        """
+        deadline = deadline or time.monotonic() + self.queue_timeout
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.name, "circuit open", retry_after=self.breaker.retry_after())
+
+        # A probe that never settles (cancelled by a hedge, a deadline or a client disconnect,
+        # or an unexpected error) must still clear `probing`, or the breaker stays shut for good
+        settled = False
+        try:
+            response: Optional[httpx.Response] = None
+            error: Optional[Exception] = None
+            for attempt in range(settings.UPSTREAM_MAX_RETRIES + 1):
+                await self.bucket.acquire(deadline, self.name)
+                try:
+                    response, error = await send(), None
+                except httpx.TransportError as e:
+                    response, error = None, e
+                if response is not None and response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    settled = True
+                    return response
+
+                wait = self._backoff(attempt)
+                if response is not None:
+                    UPSTREAM_RETRIES.labels(self.name, str(response.status_code)).inc()
+                    hinted = retry_after_seconds(response)
+                    if response.status_code == 429:
+                        self.bucket.pause(hinted if hinted is not None else wait)
+                    if hinted is not None:
+                        wait = hinted
+                else:
+                    UPSTREAM_RETRIES.labels(self.name, type(error).__name__).inc()
+                if attempt == settings.UPSTREAM_MAX_RETRIES or time.monotonic() + wait > deadline:
+                    break
+                if response is not None:
+                    await response.aclose()  # a streamed response holds its connection until closed
+                await asyncio.sleep(wait)
+
+            if response is not None and response.status_code != 429:
+                # a 429 means rate limited, not down: it doesn't count towards opening the breaker
+                self.breaker.record_failure()
+                settled = True
+            if response is not None:
+                return response
+            self.breaker.record_failure()
+            settled = True
+            raise error
+        except (asyncio.CancelledError, UpstreamUnavailable):
+            # cancelled, or no rate-limit token in time: neither a success nor a failure
+            raise
+        except BaseException:
+            if not settled:
+                self.breaker.record_failure()
+                settled = True
+            raise
+        finally:
+            if not settled:
+                self.breaker.probing = False
+
+    def stats(self) -> dict:
+        return {
+            "tokens": round(self.bucket.level(), 3),
+            "rate": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "paused_for": round(max(0.0, self.bucket.paused_until - time.monotonic()), 3),
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive,
+            "breaker_retry_after": round(self.breaker.retry_after(), 3),
+        }
+
+
+_upstreams: Dict[str, Upstream] = {}
+
+# name -> (rate, burst) settings
+UPSTREAM_SETTINGS = {
+    "semantic_scholar": ("SEMANTIC_SCHOLAR_RATE", "SEMANTIC_SCHOLAR_BURST"),
+    "arxiv": ("ARXIV_RATE", "ARXIV_BURST"),
+    "cosmos_rp": ("COSMO_RP_RATE", "COSMO_RP_BURST"),
+}
+
+
+def get_upstream(name: str) -> Upstream:
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        rate, burst = (getattr(settings, s) for s in UPSTREAM_SETTINGS[name])
+        upstream = _upstreams[name] = Upstream(name, rate, burst, settings.UPSTREAM_QUEUE_TIMEOUT)
+    return upstream
+
+
+def upstream_stats() -> dict:
+    return {name: u.stats() for name, u in _upstreams.items()}
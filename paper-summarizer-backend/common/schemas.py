@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class Paper(BaseModel):
     id: Optional[str] = None
@@ -14,6 +14,8 @@ class Paper(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     limit: int = 5
+    # default: upstream (local-first); keyword: local BM25 only; fused: BM25 and upstream via rank fusion
+    mode: Literal["default", "keyword", "fused"] = "default"
 
 class SearchResponse(BaseModel):
     papers: List[Paper]
@@ -27,8 +29,27 @@ class SummarizeResponse(BaseModel):
     summary: str
     highlights: Optional[List[str]] = None
 
+class SummarizeBatchItem(SummarizeRequest):
+    id: Optional[str] = None
+
+class SummarizeBatchRequest(BaseModel):
+    items: List[SummarizeBatchItem]
+
+class SummarizeBatchResult(BaseModel):
+    id: Optional[str] = None
+    summary: str = ""
+    highlights: Optional[List[str]] = None
+    error: Optional[str] = None
+
+class SummarizeBatchResponse(BaseModel):
+    results: List[SummarizeBatchResult]
+
 class CitationRequest(BaseModel):
     papers: List[Paper]
 
 class CitationResponse(BaseModel):
     citations: List[dict]  # {paper_id, apa, bibtex}
+
+class CitationExportRequest(BaseModel):
+    papers: List[Paper]
+    format: Literal["apa", "mla", "ieee", "bibtex", "ris", "csl-json"] = "bibtex"
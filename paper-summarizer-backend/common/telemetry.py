@@ -0,0 +1,126 @@
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Set per incoming request and forwarded on every outbound call (see common.http)
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of handled HTTP requests",
+    ["service", "method", "endpoint", "status"],
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["service"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of outbound calls per upstream (Semantic Scholar, arXiv, Cosmos RP, agent hops)",
+    ["upstream", "outcome"],
+)
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Latency of each /api/chat pipeline stage",
+    ["stage", "outcome"],
+)
+MODEL_INFERENCE = Histogram(
+    "summarizer_inference_seconds",
+    "Wall time of one summarizer model batch",
+)
+BATCH_SIZE = Histogram(
+    "summarizer_batch_size",
+    "Number of texts per summarizer model batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+QUEUE_DEPTH = Gauge(
+    "summarizer_queue_depth",
+    "Summarize jobs waiting for a model batch",
+)
+REPLICAS_BUSY = Gauge(
+    "summarizer_replicas_busy",
+    "Model replicas currently running a batch",
+)
+REJECTED = Counter(
+    "summarizer_rejected_total",
+    "Summarize requests rejected with 503 because the queue was full",
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (hit, miss, coalesced)",
+    ["cache", "result"],
+)
+UPSTREAM_TOKENS = Gauge(
+    "upstream_rate_limit_tokens",
+    "Tokens left in each upstream's rate-limit bucket (negative = callers queued)",
+    ["upstream"],
+)
+BREAKER_STATE = Gauge(
+    "upstream_breaker_state",
+    "Circuit breaker state per upstream: 0 closed, 1 half-open, 2 open",
+    ["upstream"],
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retryable_failures_total",
+    "Upstream attempts that failed retryably, by upstream and cause (status code or exception)",
+    ["upstream", "cause"],
+)
+PROMPT_TOKENS = Histogram(
+    "chat_prompt_tokens",
+    "Estimated prompt tokens per Cosmos RP request: `sent`, and `uncompacted` for the legacy format",
+    ["kind"],
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000),
+)
+
+
+def current_request_id() -> str | None:
+    return request_id_var.get()
+
+
+@contextmanager
+def observe_upstream(upstream: str):
+    """Time one outbound call; the outcome label is "error" if the block raises."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, outcome).observe(time.perf_counter() - started)
+
+
+def install_metrics(app: FastAPI, service: str):
+    """Add request id propagation, per-endpoint latency/in-flight metrics and GET /metrics."""
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        in_flight = IN_FLIGHT.labels(service)
+        in_flight.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers[REQUEST_ID_HEADER] = request_id
+            return response
+        finally:
+            in_flight.dec()
+            route = request.scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(service, request.method, endpoint, str(status)).observe(time.perf_counter() - started)
+            request_id_var.reset(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
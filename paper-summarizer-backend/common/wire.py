@@ -0,0 +1,135 @@
+"""
+Encoding of request/response bodies between the services.
+
+JSON goes through orjson when it is installed, and msgpack is used instead
+when a caller sends or asks for it (Content-Type / Accept:
+application/x-msgpack). Both libraries are optional; without them everything
+falls back to the standard json module. Paper lists are dumped in a single
+pydantic-core pass (`dump_papers`) rather than one model_dump per paper.
+"""
+import json
+from typing import Any, List, Optional
+
+import httpx
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+
+from common.config import settings
+from common.schemas import Paper
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: compact binary bodies between agents
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+
+PAPERS = TypeAdapter(List[Paper])
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dump_papers(papers: List[Paper]) -> List[dict]:
+    return PAPERS.dump_python(papers)
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(obj: Any) -> bytes:
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def is_msgpack(media_type: Optional[str]) -> bool:
+    return msgpack is not None and MSGPACK in (media_type or "")
+
+
+def dumps(obj: Any, media_type: str) -> bytes:
+    return dumps_msgpack(obj) if is_msgpack(media_type) else dumps_json(obj)
+
+
+def loads(body: bytes, media_type: Optional[str] = None) -> Any:
+    if is_msgpack(media_type):
+        return msgpack.unpackb(body, raw=False)
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class WireResponse(Response):
+    """JSON response encoded with orjson; skips FastAPI's jsonable_encoder pass when returned directly."""
+
+    media_type = JSON
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def wire_response(content: Any, request: Request, status_code: int = 200) -> Response:
+    """msgpack if the caller's Accept header asks for it, JSON otherwise."""
+    if is_msgpack(request.headers.get("accept")):
+        return MsgpackResponse(content, status_code=status_code)
+    return WireResponse(content, status_code=status_code)
+
+
+class WireRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body(), self.scope.get("wire_content_type"))
+        return self._json
+
+
+class WireRoute(APIRoute):
+    """
+    Route class that parses bodies with `loads`, so endpoints declared with
+    Pydantic body models also accept msgpack. FastAPI only hands JSON
+    content types to request.json(), so a msgpack request is presented to it
+    as JSON and decoded by WireRequest.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            scope = request.scope
+            content_type = request.headers.get("content-type")
+            if is_msgpack(content_type):
+                scope = dict(scope, wire_content_type=content_type)
+                scope["headers"] = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+                scope["headers"].append((b"content-type", JSON.encode()))
+            return await handler(WireRequest(scope, request.receive))
+
+        return route_handler
+
+
+async def post(client: httpx.AsyncClient, url: str, obj: Any, timeout: float) -> httpx.Response:
+    """POST `obj` to another agent in the INTERNAL_WIRE_FORMAT; read the reply with `read`."""
+    media_type = MSGPACK if settings.INTERNAL_WIRE_FORMAT == "msgpack" and msgpack is not None else JSON
+    headers = {"Content-Type": media_type, "Accept": media_type}
+    return await client.post(url, content=dumps(obj, media_type), headers=headers, timeout=timeout)
+
+
+def read(response: httpx.Response) -> Any:
+    return loads(response.content, response.headers.get("content-type"))
+
@@ -0,0 +1,218 @@
+# services/citation_agent/formats.py
+import hashlib
+import json
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from common.cache import LRUCache
+from common.schemas import Paper
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_STOPWORDS = {"a", "an", "the", "on", "of", "in", "for", "and", "to", "with", "is", "are", "towards", "toward"}
+
+
+def split_name(name: str) -> Tuple[List[str], str]:
+    """'Ashish Vaswani' -> (['Ashish'], 'Vaswani'); 'Vaswani, Ashish' is understood too."""
+    if "," in name:
+        last, _, given = name.partition(",")
+        return given.split(), last.strip()
+    parts = name.split()
+    return parts[:-1], parts[-1] if parts else ""
+
+
+def _initials(given: List[str]) -> str:
+    return " ".join(g[0] + "." for g in given if g)
+
+
+def authors_to_apa(authors: List[str]):
+    if not authors:
+        return ""
+    # simple: Last, F. ; take up to 3 authors then "et al."
+    def conv(name):
+        parts = name.split()
+        last = parts[-1]
+        initials = " ".join([p[0]+'.' for p in parts[:-1]]) if len(parts) > 1 else ""
+        return f"{last}, {initials}".strip()
+    if len(authors) <= 3:
+        return ", ".join(conv(a) for a in authors)
+    else:
+        return ", ".join(conv(a) for a in authors[:3]) + ", et al."
+
+
+def make_bibtex(paper: Paper, key: str = None):
+    key = key or (paper.arxiv_id or paper.id or "paper").replace("/", "_")
+    authors = " and ".join(paper.authors or ["Unknown"])
+    entry = f"@article{{{key},\n  title={{ {paper.title} }},\n  author={{ {authors} }},\n  year={{ {paper.year or ''} }},\n  url={{ {paper.url or ''} }}\n}}"
+    return entry
+
+
+# Placeholder key in cached BibTeX entries; the real key depends on the rest of the batch
+BIBTEX_KEY = "{key}"
+
+
+def with_key(bibtex: str, key: str) -> str:
+    return bibtex.replace(BIBTEX_KEY, key, 1)
+
+
+def format_apa(p: Paper) -> str:
+    return f"{authors_to_apa(p.authors or [])} ({p.year or ''}). {p.title}. {p.url or ''}"
+
+
+def format_mla(p: Paper) -> str:
+    authors = p.authors or []
+    if authors:
+        given, last = split_name(authors[0])
+        first = f"{last}, {' '.join(given)}".strip(", ")
+        if len(authors) == 1:
+            names = first
+        elif len(authors) == 2:
+            names = f"{first}, and {authors[1]}"
+        else:
+            names = f"{first}, et al"
+        names = names.rstrip(".") + ". "
+    else:
+        names = ""
+    title = (p.title or "").rstrip(".")
+    tail = ", ".join(str(x) for x in (p.year, p.url) if x)
+    return f'{names}"{title}." {tail}.' if tail else f'{names}"{title}."'
+
+
+def format_ieee(p: Paper) -> str:
+    """IEEE reference without its [n] label, which depends on the position in the list."""
+    names = []
+    for name in p.authors or []:
+        given, last = split_name(name)
+        names.append(f"{_initials(given)} {last}".strip())
+    if len(names) > 6:
+        authors = f"{names[0]} et al."
+    elif len(names) > 2:
+        authors = ", ".join(names[:-1]) + ", and " + names[-1]
+    else:
+        authors = " and ".join(names)
+    title = (p.title or "").rstrip(".")
+    quoted = f'"{title}," {p.year}.' if p.year else f'"{title}."'
+    out = f"{authors}, {quoted}" if authors else quoted
+    if p.url:
+        out += f" [Online]. Available: {p.url}"
+    return out.strip()
+
+
+def format_ris(p: Paper) -> str:
+    doi = (p.external_ids or {}).get("DOI")
+    lines = ["TY  - JOUR", f"TI  - {p.title or ''}"]
+    lines += [f"AU  - {last}, {' '.join(given)}".rstrip(", ") for given, last in map(split_name, p.authors or [])]
+    if p.year:
+        lines.append(f"PY  - {p.year}")
+    if p.abstract:
+        lines.append(f"AB  - {p.abstract}")
+    if p.url:
+        lines.append(f"UR  - {p.url}")
+    if doi:
+        lines.append(f"DO  - {doi}")
+    lines.append("ER  - ")
+    return "\n".join(lines)
+
+
+def format_csl(p: Paper) -> dict:
+    """CSL-JSON item without its "id", which is the batch's citation key."""
+    item = {"type": "article", "title": p.title or ""}
+    authors = []
+    for name in p.authors or []:
+        given, last = split_name(name)
+        authors.append({"family": last, "given": " ".join(given)} if given else {"literal": last})
+    if authors:
+        item["author"] = authors
+    if p.year:
+        item["issued"] = {"date-parts": [[p.year]]}
+    if p.url:
+        item["URL"] = p.url
+    doi = (p.external_ids or {}).get("DOI")
+    if doi:
+        item["DOI"] = doi
+    if p.arxiv_id:
+        item["number"] = f"arXiv:{p.arxiv_id}"
+    if p.abstract:
+        item["abstract"] = p.abstract
+    return item
+
+
+FORMATTERS: Dict[str, Callable[[Paper], object]] = {
+    "apa": format_apa,
+    "mla": format_mla,
+    "ieee": format_ieee,
+    "ris": format_ris,
+    "csl-json": format_csl,
+}
+
+MEDIA_TYPES = {
+    "apa": ("text/plain", "txt"),
+    "mla": ("text/plain", "txt"),
+    "ieee": ("text/plain", "txt"),
+    "bibtex": ("application/x-bibtex", "bib"),
+    "ris": ("application/x-research-info-systems", "ris"),
+    "csl-json": ("application/vnd.citationstyles.csl+json", "json"),
+}
+
+
+def citation_key(p: Paper) -> str:
+    """Readable BibTeX key: first author's surname + year + first significant title word, e.g. vaswani2017attention."""
+    last = split_name(p.authors[0])[1] if p.authors else "anon"
+    words = _NON_ALNUM.sub(" ", (p.title or "").lower()).split()
+    word = next((w for w in words if w not in _STOPWORDS), "")
+    return _NON_ALNUM.sub("", last.lower()) + str(p.year or "") + word or "paper"
+
+
+def _suffix(n: int) -> str:
+    """1 -> a, 2 -> b, ..., 26 -> z, 27 -> aa"""
+    out = ""
+    while n:
+        n, r = divmod(n - 1, 26)
+        out = chr(ord("a") + r) + out
+    return out
+
+
+def unique_keys(bases: Iterable[str]) -> Iterator[str]:
+    """Disambiguate repeated keys with a, b, ... suffixes; the first use keeps the bare key."""
+    used = set()
+    counts: Dict[str, int] = {}
+    for base in bases:
+        key = base
+        while key in used:
+            counts[base] = counts.get(base, 0) + 1
+            key = base + _suffix(counts[base])
+        used.add(key)
+        yield key
+
+
+def fingerprint(p: Paper) -> Tuple[str, str]:
+    """Paper id + hash of its content, so an edited paper never reuses stale output."""
+    content = json.dumps(p.dict(), sort_keys=True, default=str).encode()
+    return (p.id or "", hashlib.sha1(content).hexdigest())
+
+
+class FormatCache:
+    """
+    LRU of formatted output per (paper fingerprint, format). /cite uses it on
+    the event loop and the export generator on Starlette's threadpool, so
+    the LRU is only touched under a lock; formatting itself runs outside it.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._lru = LRUCache(max_entries, name="citation_format")
+        self._lock = threading.Lock()
+
+    def format(self, p: Paper, fmt: str, fp: Tuple[str, str] = None):
+        key = (fp or fingerprint(p)) + (fmt,)
+        with self._lock:
+            out = self._lru.get(key)
+        if out is not None:
+            return out
+        out = make_bibtex(p, key=BIBTEX_KEY) if fmt == "bibtex" else FORMATTERS[fmt](p)
+        with self._lock:
+            self._lru.put(key, out)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._lru.stats()
@@ -1,10 +1,18 @@
 # services/citation_agent/main.py
-from fastapi import FastAPI
+import json
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from common.schemas import CitationRequest, CitationResponse, Paper
-from typing import List
+from fastapi.responses import StreamingResponse
+from common.schemas import CitationRequest, CitationResponse, CitationExportRequest, Paper
+from common.config import settings
+from typing import Iterator, List
+from common.telemetry import install_metrics
+from common.wire import WireRoute, wire_response
+from .formats import MEDIA_TYPES, FormatCache, citation_key, fingerprint, unique_keys, with_key
 
 app = FastAPI(title="Citation Agent")
+app.router.route_class = WireRoute  # JSON via orjson, msgpack on request
+install_metrics(app, "citation_agent")
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,32 +22,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def authors_to_apa(authors: List[str]):
-    if not authors:
-        return ""
-    # simple: Last, F. ; take up to 3 authors then "et al."
-    def conv(name):
-        parts = name.split()
-        last = parts[-1]
-        initials = " ".join([p[0]+'.' for p in parts[:-1]]) if len(parts) > 1 else ""
-        return f"{last}, {initials}".strip()
-    if len(authors) <= 3:
-        return ", ".join(conv(a) for a in authors)
-    else:
-        return ", ".join(conv(a) for a in authors[:3]) + ", et al."
-
-def make_bibtex(paper: Paper):
-    key = (paper.arxiv_id or paper.id or "paper").replace("/", "_")
-    authors = " and ".join(paper.authors or ["Unknown"])
-    entry = f"@article{{{key},\n  title={{ {paper.title} }},\n  author={{ {authors} }},\n  year={{ {paper.year or ''} }},\n  url={{ {paper.url or ''} }}\n}}"
-    return entry
+# Formatted output per paper, reused across requests (reading lists overlap heavily)
+cache = FormatCache(max_entries=settings.CITATION_CACHE_SIZE)
+
+def bibtex_base_key(p: Paper) -> str:
+    return (p.arxiv_id or p.id or "paper").replace("/", "_")
 
 @app.post("/cite", response_model=CitationResponse)
-async def cite(req: CitationRequest):
+async def cite(req: CitationRequest, request: Request):
     out = []
-    for p in req.papers:
-        apa_auth = authors_to_apa(p.authors or [])
-        apa = f"{apa_auth} ({p.year or ''}). {p.title}. {p.url or ''}"
-        bib = make_bibtex(p)
+    keys = unique_keys(bibtex_base_key(p) for p in req.papers)
+    for p, key in zip(req.papers, keys):
+        fp = fingerprint(p)
+        apa = cache.format(p, "apa", fp)
+        bib = with_key(cache.format(p, "bibtex", fp), key)
         out.append({"paper_id": p.id, "apa": apa, "bibtex": bib})
-    return CitationResponse(citations=out)
+    return wire_response({"citations": out}, request)
+
+def render_export(papers: List[Paper], fmt: str) -> Iterator[str]:
+    """Yield the export in chunks of CITATION_EXPORT_CHUNK papers, so large lists start streaming at once."""
+    keys = unique_keys(citation_key(p) for p in papers)
+    chunk_size = max(1, settings.CITATION_EXPORT_CHUNK)
+    if fmt == "csl-json":
+        yield "["
+    for start in range(0, len(papers), chunk_size):
+        parts = []
+        for i, p in enumerate(papers[start:start + chunk_size], start=start):
+            entry = cache.format(p, fmt)
+            key = next(keys)
+            if fmt == "bibtex":
+                parts.append(with_key(entry, key) + "\n\n")
+            elif fmt == "csl-json":
+                parts.append(("," if i else "") + json.dumps({"id": key, **entry}))
+            elif fmt == "ieee":
+                parts.append(f"[{i + 1}] {entry}\n")
+            else:
+                parts.append(entry + "\n\n")
+        yield "".join(parts)
+    if fmt == "csl-json":
+        yield "]"
+
+@app.post("/cite/export")
+async def cite_export(req: CitationExportRequest):
+    media_type, ext = MEDIA_TYPES[req.format]
+    return StreamingResponse(
+        render_export(req.papers, req.format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="citations.{ext}"'},
+    )
+
+@app.get("/stats")
+async def stats():
+    return {"cache": cache.stats()}
@@ -1,30 +1,98 @@
 from passlib.context import CryptContext
+import asyncio
 import jwt, time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+from sqlalchemy import event
+from common.cache import LRUCache
 from common.config import settings
-from sqlmodel import Session
-from .db import engine
+from .db import async_session
 from .models import User
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 JWT_EXP = 60*60*24*7  # 7 days
 
+# bcrypt is deliberately slow; a small dedicated pool keeps login storms from
+# taking the threads and CPU that chat requests need
+_hash_pool = ThreadPoolExecutor(max_workers=max(1, settings.AUTH_HASH_WORKERS), thread_name_prefix="bcrypt")
+
 def hash_password(pw: str) -> str:
     return pwd_context.hash(pw)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+async def hash_password_async(pw: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, hash_password, pw)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, plain, hashed)
+
 def create_access_token(user_id: int, email: str):
     payload = {"sub": str(user_id), "email": email, "exp": int(time.time()) + JWT_EXP}
     token = jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
     return token
 
-def get_current_user_from_token(token: str):
+class TokenCache:
+    """
+    LRU + TTL cache of verified token -> user. An entry never outlives its
+    token's expiry, and all of a user's entries are dropped when the user row
+    changes.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300):
+        self.ttl = ttl
+        self._lru = LRUCache(max_entries, name="auth_token", clock=time.time, on_drop=self._forget)
+        self._by_user: Dict[int, Set[str]] = {}
+        # invalidation can come from a flush on a worker thread
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            return self._lru.get(token)
+
+    def put(self, token: str, user: User, token_exp: float):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._lru.put(token, user, expires=min(time.time() + self.ttl, token_exp))
+            self._by_user.setdefault(user.id, set()).add(token)
+
+    def _forget(self, token: str, user: User):
+        tokens = self._by_user.get(user.id)
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user.id]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in self._by_user.pop(user_id, ()):
+                self._lru.pop(token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._lru.stats()
+
+token_cache = TokenCache(max_entries=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+
+async def get_current_user_from_token(token: str):
+    user = token_cache.get(token)
+    if user is not None:
+        return user
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
         user_id = int(payload.get("sub"))
-        with Session(engine) as s:
-            user = s.get(User, user_id)
-            return user
+        async with async_session() as s:
+            user = await s.get(User, user_id)
     except Exception:
         return None
+    if user:
+        token_cache.put(token, user, payload.get("exp", float("inf")))
+    return user
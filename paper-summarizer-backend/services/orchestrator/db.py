@@ -1,7 +1,26 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from common.config import settings
 
+# Async drivers for the sync URLs in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
 engine = create_engine(settings.DATABASE_URL, echo=False)
+# Request handlers use this one, so DB round trips don't occupy worker threads
+async_engine = create_async_engine(async_url(settings.DATABASE_URL), echo=False)
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+
+def async_session() -> AsyncSession:
+    # expire_on_commit=False: returned rows stay usable after the session closes (e.g. in the token cache)
+    return AsyncSession(async_engine, expire_on_commit=False)
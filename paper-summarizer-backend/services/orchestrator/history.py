@@ -0,0 +1,202 @@
+# services/orchestrator/history.py
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+import sqlmodel
+
+from .db import async_session
+from .models import ChatAnswer, QueryPaper, QueryRecord, QuerySummary
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def is_complete(r: dict) -> bool:
+    """
+    No stage failed and every paper with an abstract got a summary: the
+    summarize stage leaves per-paper failures as empty summaries rather
+    than errors, and a partial answer must not be reused.
+    """
+    if r["errors"]:
+        return False
+    return all(
+        (sm or {}).get("summary") or not p.get("abstract")
+        for p, sm in zip(r["papers"], r["summaries"])
+    )
+
+
+async def write_batch(records: List[dict]):
+    """Insert a batch of chat results in one transaction."""
+    async with async_session() as s:
+        queries = [
+            QueryRecord(
+                user_id=r["user_id"], query=r["query"], query_norm=normalize_query(r["query"]),
+                limit=r["limit"], complete=is_complete(r), created_at=r["created_at"],
+            )
+            for r in records
+        ]
+        s.add_all(queries)
+        await s.flush()  # assigns ids for the child rows
+        for q, r in zip(queries, records):
+            s.add_all(
+                QueryPaper(query_id=q.id, position=i, paper_id=p.get("id"), title=p.get("title"), data=json.dumps(p))
+                for i, p in enumerate(r["papers"])
+            )
+            s.add_all(
+                QuerySummary(
+                    query_id=q.id, position=i, paper_id=sm.get("paper_id"),
+                    summary=sm.get("summary", ""), highlights=json.dumps(sm.get("highlights", [])),
+                )
+                for i, sm in enumerate(r["summaries"])
+            )
+            s.add(ChatAnswer(
+                query_id=q.id, chat_response=r["chat_response"],
+                citations=json.dumps(r["citations"]), errors=json.dumps(r["errors"]),
+            ))
+        await s.commit()
+
+
+async def load_record(s, q: QueryRecord) -> dict:
+    """A stored query in the shape /api/chat returns."""
+    papers = (await s.exec(
+        sqlmodel.select(QueryPaper).where(QueryPaper.query_id == q.id).order_by(QueryPaper.position)
+    )).all()
+    summaries = (await s.exec(
+        sqlmodel.select(QuerySummary).where(QuerySummary.query_id == q.id).order_by(QuerySummary.position)
+    )).all()
+    answer = await s.get(ChatAnswer, q.id)
+    return {
+        "query": q.query,
+        "papers": [json.loads(p.data) for p in papers],
+        "summaries": [
+            {"paper_id": sm.paper_id, "summary": sm.summary, "highlights": json.loads(sm.highlights)}
+            for sm in summaries
+        ],
+        "citations": json.loads(answer.citations) if answer else [],
+        "chat_response": answer.chat_response if answer else "",
+        "errors": json.loads(answer.errors) if answer else {},
+        "history_id": q.id,
+        "created_at": q.created_at,
+    }
+
+
+async def find_recent(user_id: int, query: str, limit: int, max_age: float) -> Optional[dict]:
+    """The user's latest complete answer to the same query within `max_age` seconds."""
+    async with async_session() as s:
+        q = (await s.exec(
+            sqlmodel.select(QueryRecord)
+            .where(
+                QueryRecord.user_id == user_id,
+                QueryRecord.query_norm == normalize_query(query),
+                QueryRecord.created_at >= time.time() - max_age,
+                QueryRecord.limit == limit,
+                QueryRecord.complete == True,  # noqa: E712
+            )
+            .order_by(QueryRecord.created_at.desc())
+            .limit(1)
+        )).first()
+        return await load_record(s, q) if q else None
+
+
+async def get_record(user_id: int, query_id: int) -> Optional[dict]:
+    async with async_session() as s:
+        q = await s.get(QueryRecord, query_id)
+        if not q or q.user_id != user_id:
+            return None
+        return await load_record(s, q)
+
+
+async def list_history(user_id: int, limit: int, before: Optional[int] = None) -> dict:
+    """
+    Keyset pagination, newest first: pass the returned `next_before` to get the
+    next page. Seeks on the (user_id, id) index, so the cost doesn't grow with
+    how deep the page is.
+    """
+    async with async_session() as s:
+        stmt = sqlmodel.select(QueryRecord).where(QueryRecord.user_id == user_id)
+        if before is not None:
+            stmt = stmt.where(QueryRecord.id < before)
+        rows = (await s.exec(stmt.order_by(QueryRecord.id.desc()).limit(limit))).all()
+    return {
+        "items": [
+            {"id": r.id, "query": r.query, "limit": r.limit, "complete": r.complete, "created_at": r.created_at}
+            for r in rows
+        ],
+        "next_before": rows[-1].id if len(rows) == limit else None,
+    }
+
+
+class HistoryWriter:
+    """
+    Writes chat results off the request path: `record` only enqueues, and a
+    background task inserts up to `batch_size` results per transaction,
+    waiting at most `flush_ms` to fill a batch. When the queue is full new
+    results are dropped rather than slowing requests down.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_ms: int = 200, max_queue: int = 10000):
+        self.batch_size = max(1, batch_size)
+        self.flush_ms = flush_ms
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued, then stop."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def record(self, user_id: int, query: str, limit: int, result: dict):
+        try:
+            self._queue.put_nowait({
+                "user_id": user_id, "query": query, "limit": limit, "created_at": time.time(),
+                "papers": result["papers"], "summaries": result["summaries"], "citations": result["citations"],
+                "chat_response": result["chat_response"], "errors": result.get("errors") or {},
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_ms / 1000
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await write_batch(batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print("History write error:", e)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -1,18 +1,51 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Header
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import sqlmodel
-from sqlmodel import Session
-from .db import engine, init_db
+from .db import async_engine, async_session, init_db
 from .models import User
-from .auth import hash_password, verify_password, create_access_token, get_current_user_from_token
+from .pipeline import Pipeline, Stage, StageFailed, describe_error
+from .history import HistoryWriter, find_recent, get_record, list_history
+from .prefetch import Precomputed, Prefetcher
+from .prompt import COMPACT_SYSTEM_PROMPT, PROMPT_VERSION, AnswerCache, answer_key, count_prompt_tokens, serialize_context
+from .auth import hash_password_async, verify_password_async, create_access_token, get_current_user_from_token, token_cache
 from common.schemas import SearchRequest, SearchResponse, SummarizeRequest, SummarizeResponse, CitationRequest, CitationResponse, Paper
 import httpx
 from common.utils import sanitize_text
 from common.config import settings  # Load settings
+from common.http import start_client, close_client, get_client
+from common.telemetry import install_metrics, observe_upstream, STAGE_LATENCY, PROMPT_TOKENS
+from common.scheduler import UpstreamUnavailable, get_upstream, upstream_stats
+from common import wire
 
-app = FastAPI(title="Orchestrator / Crew API")
+history = HistoryWriter(
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_ms=settings.HISTORY_FLUSH_MS,
+    max_queue=settings.HISTORY_QUEUE_SIZE,
+)
+answer_cache = AnswerCache(settings.CHAT_ANSWER_CACHE_SIZE, settings.CHAT_ANSWER_CACHE_TTL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_client()
+    if settings.HISTORY_ENABLED:
+        history.start()
+    if settings.PREFETCH_ENABLED:
+        prefetcher.start()
+    yield
+    await prefetcher.stop()
+    await history.stop()
+    await close_client()
+    await async_engine.dispose()
+
+app = FastAPI(title="Orchestrator / Crew API", lifespan=lifespan)
+install_metrics(app, "orchestrator")
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,35 +70,35 @@ class LoginPayload(BaseModel):
     password: str
 
 @app.post("/auth/register")
-def register(payload: RegisterPayload):
-    with Session(engine) as s:
-        user = s.exec(sqlmodel.select(User).where(User.email == payload.email)).first()
+async def register(payload: RegisterPayload):
+    async with async_session() as s:
+        user = (await s.exec(sqlmodel.select(User).where(User.email == payload.email))).first()
         if user:
             raise HTTPException(status_code=400, detail="Email exists")
-        u = User(email=payload.email, hashed_password=hash_password(payload.password))
+        u = User(email=payload.email, hashed_password=await hash_password_async(payload.password))
         s.add(u)
-        s.commit()
-        s.refresh(u)
+        await s.commit()
+        await s.refresh(u)
         token = create_access_token(u.id, u.email)
         return {"id": u.id, "email": u.email, "access_token": token}
 
 @app.post("/auth/login")
-def login(payload: LoginPayload):
-    with Session(engine) as s:
+async def login(payload: LoginPayload):
+    async with async_session() as s:
         statement = sqlmodel.select(User).where(User.email == payload.email)
-        result = s.exec(statement).first()
-        if not result or not verify_password(payload.password, result.hashed_password):
-            raise HTTPException(status_code=401, detail="Invalid creds")
-        token = create_access_token(result.id, result.email)
-        return {"access_token": token}
+        result = (await s.exec(statement)).first()
+    if not result or not await verify_password_async(payload.password, result.hashed_password):
+        raise HTTPException(status_code=401, detail="Invalid creds")
+    token = create_access_token(result.id, result.email)
+    return {"access_token": token}
 
-def get_current_user(authorization: str | None = Header(None)):
+async def get_current_user(authorization: str | None = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing token")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token format")
     token = authorization.split(" ", 1)[1]
-    user = get_current_user_from_token(token)
+    user = await get_current_user_from_token(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
     return user
@@ -90,77 +123,140 @@ async def call_cosmos_rp(messages: list, max_tokens: int = 512):
         "top_p": 0.9,
     }
     
-    async with httpx.AsyncClient(timeout=60) as client:
-        try:
-            response = await client.post(settings.COSMO_RP_URL, headers=headers, json=payload)
+    client = get_client()
+    try:
+        with observe_upstream("cosmos_rp"):
+            response = await get_upstream("cosmos_rp").call(
+                lambda: client.post(settings.COSMO_RP_URL, headers=headers, json=payload, timeout=settings.COSMO_RP_TIMEOUT)
+            )
             response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Cosmos RP API error: {e.response.text}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Cosmos RP API failed: {str(e)}")
+        return response.json()["choices"][0]["message"]["content"]
+    except UpstreamUnavailable as e:
+        # breaker open or no rate-limit token in time; the chat stage falls back to summaries only
+        raise HTTPException(status_code=503, detail=f"Cosmos RP API unavailable: {e.reason}")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Cosmos RP API error: {e.response.text}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cosmos RP API failed: {str(e)}")
 
-@app.post("/api/chat")
-async def chat(payload: SearchRequest, user=Depends(get_current_user)):
-    q = sanitize_text(payload.query)
-    if not q:
-        raise HTTPException(status_code=400, detail="Empty query")
+async def stream_cosmos_rp(messages: list, max_tokens: int = 512):
+    """
+    Stream a Cosmos RP completion, yielding content deltas as they arrive.
+    If the upstream ignores `stream` and answers with plain JSON, the whole
+    message is yielded once.
+    """
+    if not settings.COSMO_RP_URL or not settings.COSMO_RP_KEY:
+        raise HTTPException(status_code=500, detail="Cosmos RP API not configured")
+
+    headers = {
+        "Authorization": f"Bearer {settings.COSMO_RP_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": "cosmosrp",
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "stream": True,
+    }
+
+    client = get_client()
+    with observe_upstream("cosmos_rp"):
+        try:
+            response = await get_upstream("cosmos_rp").call(lambda: client.send(
+                client.build_request("POST", settings.COSMO_RP_URL, headers=headers, json=payload, timeout=settings.COSMO_RP_TIMEOUT),
+                stream=True,
+            ))
+        except UpstreamUnavailable as e:
+            raise HTTPException(status_code=503, detail=f"Cosmos RP API unavailable: {e.reason}")
+        try:
+            if response.status_code >= 400:
+                body = await response.aread()
+                raise HTTPException(status_code=response.status_code, detail=f"Cosmos RP API error: {body.decode(errors='replace')}")
+            if response.headers.get("content-type", "").startswith("application/json"):
+                data = json.loads(await response.aread())
+                yield data["choices"][0]["message"]["content"]
+                return
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            await response.aclose()
+
+def _summary_entry(p: Paper, sdata: dict | None = None):
+    sdata = sdata or {}
+    return {
+        "paper_id": p.id,
+        "summary": sdata.get("summary", "") or "",
+        "highlights": sdata.get("highlights", []) if isinstance(sdata.get("highlights"), list) else []
+    }
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        # 1) Search
-        r = await client.post(f"{SEARCH_AGENT}/search", json={"query": q, "limit": payload.limit})
+async def summarize_paper(client: httpx.AsyncClient, p: Paper):
+    text = p.abstract or ""
+    if not text:
+        return _summary_entry(p)
+    sr = {"text": text, "style": "abstractive", "max_tokens": 256}
+    with observe_upstream("summarizer_agent"):
+        r = await client.post(f"{SUMMARIZER_AGENT}/summarize", json=sr, timeout=settings.AGENT_TIMEOUT)
         r.raise_for_status()
-        search_resp = r.json()
-        papers = [Paper(**p) for p in search_resp.get("papers", [])]
-
-        # 2) Summarize top-N (parallel)
-        summaries = []
-        async def summarize_paper(p: Paper):
-            text = p.abstract or ""
-            if not text:
-                return {"paper_id": p.id, "summary": "", "highlights": []}
-            sr = {"text": text, "style": "abstractive", "max_tokens": 256}
-            r2 = await client.post(f"{SUMMARIZER_AGENT}/summarize", json=sr)
-            r2.raise_for_status()
-            sdata = r2.json()
-            return {
-                "paper_id": p.id,
-                "summary": sdata.get("summary", ""),
-                "highlights": sdata.get("highlights", []) if isinstance(sdata.get("highlights"), list) else []
-            }
-
-        tasks = [summarize_paper(p) for p in papers]
-        import asyncio
-        summaries = await asyncio.gather(*tasks)
-
-        # 3) Citations
-        r3 = await client.post(f"{CITATION_AGENT}/cite", json={"papers": [p.dict() for p in papers]})
-        r3.raise_for_status()
-        citations = r3.json()
-
-    # 4) Generate conversational response with Cosmos RP
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a helpful assistant. "
-                "Provide clear, accurate, and concise responses in a professional yet friendly manner. "
-                "Keep your tone polite, approachable, and supportive while focusing on delivering useful information.\n\n"
-
-                "# Emoji policy for responses:\n"
-                "1. Include 0–3 small, relevant emojis per response to improve readability and friendliness — "
-                "do not add more than three. Use emojis sparingly and only when they add clarity or warmth.\n"
-                "2. Choose emojis that match the content: e.g. 🔍 for research/questions, 📄 for papers/documents, "
-                "💡 for suggestions/ideas, ✅ for confirmations/success, ⚠️ for warnings, 🔗 for links, 📚 for references, 👍 for encouragement.\n"
-                "3. Place emojis inline near the sentence they relate to (not a whole block of emojis at the end). "
-                "Avoid using emojis in a way that reduces professionalism.\n"
-                "4. Do not use emojis for sensitive topics (medical, legal, personal health, finances) unless explicitly asked; "
-                "when used with sensitive topics, prefer neutral and cautious emojis (e.g. ⚠️) and include a clear, professional note.\n"
-                "5. If summarizing a list of papers, prefix each paper title/summary line with an appropriate emoji like 📄 or 📚.\n\n"
-
-                "Keep responses concise and include emojis naturally — not as decoration. Avoid any emojis that could be interpreted as unprofessional."
-            )
-        },
+    return _summary_entry(p, r.json())
+
+async def summarize_papers(client: httpx.AsyncClient, papers: List[Paper]):
+    """
+    Summarize all abstracts with a single /summarize/batch call.
+    Falls back to one /summarize call per paper against older summarizer deployments.
+    """
+    summaries = [_summary_entry(p) for p in papers]
+    items = [
+        {"id": str(i), "text": p.abstract, "style": "abstractive", "max_tokens": 256}
+        for i, p in enumerate(papers) if p.abstract
+    ]
+    if not items:
+        return summaries
+
+    with observe_upstream("summarizer_agent"):
+        r = await client.post(f"{SUMMARIZER_AGENT}/summarize/batch", json={"items": items}, timeout=settings.AGENT_TIMEOUT)
+        if r.status_code not in (404, 405):
+            r.raise_for_status()
+    if r.status_code in (404, 405):
+        return list(await asyncio.gather(*[summarize_paper(client, p) for p in papers]))
+    for res in r.json().get("results", []):
+        # ids are positions in `papers`; per-item errors leave the empty summary in place
+        i = int(res.get("id"))
+        if not res.get("error"):
+            summaries[i] = _summary_entry(papers[i], res)
+    return summaries
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant. "
+    "Provide clear, accurate, and concise responses in a professional yet friendly manner. "
+    "Keep your tone polite, approachable, and supportive while focusing on delivering useful information.\n\n"
+
+    "# Emoji policy for responses:\n"
+    "1. Include 0–3 small, relevant emojis per response to improve readability and friendliness — "
+    "do not add more than three. Use emojis sparingly and only when they add clarity or warmth.\n"
+    "2. Choose emojis that match the content: e.g. 🔍 for research/questions, 📄 for papers/documents, "
+    "💡 for suggestions/ideas, ✅ for confirmations/success, ⚠️ for warnings, 🔗 for links, 📚 for references, 👍 for encouragement.\n"
+    "3. Place emojis inline near the sentence they relate to (not a whole block of emojis at the end). "
+    "Avoid using emojis in a way that reduces professionalism.\n"
+    "4. Do not use emojis for sensitive topics (medical, legal, personal health, finances) unless explicitly asked; "
+    "when used with sensitive topics, prefer neutral and cautious emojis (e.g. ⚠️) and include a clear, professional note.\n"
+    "5. If summarizing a list of papers, prefix each paper title/summary line with an appropriate emoji like 📄 or 📚.\n\n"
+
+    "Keep responses concise and include emojis naturally — not as decoration. Avoid any emojis that could be interpreted as unprofessional."
+)
+
+def legacy_chat_messages(q: str, papers: List[Paper], summaries: list):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
             "content": (
@@ -170,13 +266,302 @@ async def chat(payload: SearchRequest, user=Depends(get_current_user)):
             )
         }
     ]
-    chat_response = await call_cosmos_rp(messages, max_tokens=512)
 
+def build_chat_messages(q: str, papers: List[Paper], summaries: list):
+    if not settings.CHAT_COMPACT_PROMPT:
+        return legacy_chat_messages(q, papers, summaries)
+    return [
+        {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+        {"role": "user", "content": serialize_context(q, papers, summaries, settings.CHAT_PROMPT_TOKEN_BUDGET)},
+    ]
 
-    return {
+def chat_answer_key(q: str, papers: List[Paper], summaries: list, max_tokens: int) -> str:
+    return answer_key(q, papers, summaries, max_tokens, PROMPT_VERSION if settings.CHAT_COMPACT_PROMPT else "legacy")
+
+def prompt_usage(q: str, papers: List[Paper], summaries: list, messages: list, cached: bool) -> dict:
+    """Estimated prompt tokens for this request, next to what the legacy repr format would have sent."""
+    sent = count_prompt_tokens(messages)
+    uncompacted = count_prompt_tokens(legacy_chat_messages(q, papers, summaries))
+    if not cached:
+        PROMPT_TOKENS.labels("sent").observe(sent)
+        PROMPT_TOKENS.labels("uncompacted").observe(uncompacted)
+    return {"prompt_tokens": sent, "uncompacted_prompt_tokens": uncompacted, "answer_cached": cached}
+
+async def search_papers(client: httpx.AsyncClient, q: str, limit: int) -> List[Paper]:
+    with observe_upstream("search_agent"):
+        r = await wire.post(client, f"{SEARCH_AGENT}/search", {"query": q, "limit": limit}, settings.AGENT_TIMEOUT)
+        r.raise_for_status()
+    search_resp = wire.read(r)
+    return [Paper(**p) for p in search_resp.get("papers", [])]
+
+async def cite_papers(client: httpx.AsyncClient, papers: List[Paper]) -> list:
+    with observe_upstream("citation_agent"):
+        r = await wire.post(client, f"{CITATION_AGENT}/cite", {"papers": wire.dump_papers(papers)}, settings.AGENT_TIMEOUT)
+        r.raise_for_status()
+    return wire.read(r).get("citations", [])
+
+async def precompute(q: str, limit: int) -> Precomputed:
+    """The search, summarize and cite stages of /api/chat, for the prefetcher."""
+    client = get_client()
+    papers = await search_papers(client, q, limit)
+    summaries, citations = await asyncio.gather(summarize_papers(client, papers), cite_papers(client, papers))
+    return Precomputed(papers, summaries, citations)
+
+prefetcher = Prefetcher(
+    precompute,
+    interval=settings.PREFETCH_INTERVAL,
+    ttl=settings.PREFETCH_TTL,
+    top_k=settings.PREFETCH_TOP_K,
+    recent_k=settings.PREFETCH_RECENT_K,
+    min_score=settings.PREFETCH_MIN_SCORE,
+    budget=settings.PREFETCH_BUDGET,
+    max_live=settings.PREFETCH_MAX_LIVE,
+    max_entries=settings.PREFETCH_CACHE_SIZE,
+    half_life=settings.PREFETCH_HALF_LIFE,
+)
+
+@app.post("/api/chat")
+async def chat(payload: SearchRequest, request: Request, user=Depends(get_current_user)):
+    q = sanitize_text(payload.query)
+    if not q:
+        raise HTTPException(status_code=400, detail="Empty query")
+
+    if settings.HISTORY_ENABLED and settings.HISTORY_REUSE_SECONDS > 0:
+        try:
+            previous = await find_recent(user.id, q, payload.limit, settings.HISTORY_REUSE_SECONDS)
+        except Exception as e:
+            print("History lookup error:", e)
+            previous = None
+        if previous:
+            # same shape as a live answer; nothing was sent to Cosmos RP this time
+            previous.pop("history_id", None)
+            previous.pop("created_at", None)
+            previous["usage"] = {"prompt_tokens": 0, "uncompacted_prompt_tokens": 0, "answer_cached": True}
+            previous["precomputed"] = False
+            return wire.wire_response(previous, request)
+
+    client = get_client()
+    usage = {}
+    precomputed = None
+    if settings.PREFETCH_ENABLED:
+        prefetcher.record(q, payload.limit)
+        precomputed = prefetcher.get(q, payload.limit)
+
+    async def run_search():
+        return precomputed.papers if precomputed else await search_papers(client, q, payload.limit)
+
+    async def run_summarize(search):
+        return precomputed.summaries if precomputed else await summarize_papers(client, search)
+
+    async def run_cite(search):
+        return precomputed.citations if precomputed else await cite_papers(client, search)
+
+    async def run_chat(papers, summaries):
+        messages = build_chat_messages(q, papers, summaries)
+        key = chat_answer_key(q, papers, summaries, 512)
+        answer = answer_cache.get(key)
+        usage.update(prompt_usage(q, papers, summaries, messages, cached=answer is not None))
+        if answer is None:
+            answer = await call_cosmos_rp(messages, max_tokens=512)
+            answer_cache.put(key, answer)
+        return answer
+
+    # search -> (summarize -> chat) with cite running alongside summarize/chat
+    pipeline = Pipeline([
+        Stage("search", run_search, deadline=settings.PIPELINE_SEARCH_DEADLINE, required=True),
+        Stage("summarize", run_summarize, deps=("search",),
+              deadline=settings.PIPELINE_SUMMARIZE_DEADLINE,
+              fallback=lambda search: [_summary_entry(p) for p in search]),
+        Stage("cite", run_cite, deps=("search",),
+              deadline=settings.PIPELINE_CITE_DEADLINE, fallback=lambda search: []),
+        Stage("chat", lambda search, summarize: run_chat(search, summarize), deps=("search", "summarize"),
+              deadline=settings.PIPELINE_CHAT_DEADLINE, fallback=lambda search, summarize: ""),
+    ])
+    try:
+        with prefetcher.live_request():
+            run = await pipeline.run()
+    except StageFailed as e:
+        raise HTTPException(status_code=502, detail=f"Search failed: {e.detail}")
+    for stage, seconds in run.timings.items():
+        STAGE_LATENCY.labels(stage, "error" if stage in run.errors else "ok").observe(seconds)
+
+    papers = run.results["search"]
+    result = {
         "query": q,
-        "papers": [p.dict() for p in papers],
-        "summaries": summaries,
-        "citations": citations.get("citations", []),
-        "chat_response": chat_response  
-    }
\ No newline at end of file
+        "papers": wire.dump_papers(papers),
+        "summaries": run.results["summarize"],
+        "citations": run.results["cite"],
+        "chat_response": run.results["chat"],
+        "errors": run.errors,
+        "usage": usage,
+        "precomputed": precomputed is not None,
+    }
+    if settings.HISTORY_ENABLED:
+        history.record(user.id, q, payload.limit, result)
+    return wire.wire_response(result, request)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "upstreams": upstream_stats(),
+        "history": history.stats(),
+        "auth_cache": token_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "prefetch": prefetcher.stats(),
+    }
+
+@app.get("/api/history")
+async def history_list(
+    limit: int = Query(20, ge=1, le=100),
+    before: int | None = Query(None, description="`next_before` from the previous page"),
+    user=Depends(get_current_user),
+):
+    return await list_history(user.id, limit, before)
+
+@app.get("/api/history/{query_id}")
+async def history_item(query_id: int, user=Depends(get_current_user)):
+    record = await get_record(user.id, query_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Not found")
+    return record
+
+def _ndjson(event: str, **data) -> bytes:
+    return wire.dumps_json({"event": event, **data}) + b"\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(payload: SearchRequest, user=Depends(get_current_user)):
+    """
+    Same pipeline as /api/chat, streamed as NDJSON events: `papers` once
+    search returns, one `summary` per paper as it completes, `citations`,
+    then the Cosmos RP answer as `token` events and a final `done`. A failed
+    or timed-out stage other than search degrades as in /api/chat and is
+    reported in `done.errors`.
+    """
+    q = sanitize_text(payload.query)
+    if not q:
+        raise HTTPException(status_code=400, detail="Empty query")
+    precomputed = None
+    if settings.PREFETCH_ENABLED:
+        prefetcher.record(q, payload.limit)
+        precomputed = prefetcher.get(q, payload.limit)
+
+    async def events():
+        client = get_client()
+        cite_task = None
+        summary_tasks = []
+        errors = {}
+        try:
+            if precomputed:
+                papers, summaries, citations = precomputed.papers, precomputed.summaries, precomputed.citations
+                paper_dicts = wire.dump_papers(papers)
+                yield _ndjson("papers", query=q, papers=paper_dicts)
+                for i, summary in enumerate(summaries):
+                    yield _ndjson("summary", index=i, **summary)
+                yield _ndjson("citations", citations=citations)
+            else:
+                # same per-stage deadlines and fallbacks as the /api/chat pipeline
+                try:
+                    papers = await asyncio.wait_for(
+                        search_papers(client, q, payload.limit), settings.PIPELINE_SEARCH_DEADLINE or None
+                    )
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=502, detail=f"Search failed: {describe_error(e, settings.PIPELINE_SEARCH_DEADLINE)}"
+                    )
+                paper_dicts = wire.dump_papers(papers)
+                yield _ndjson("papers", query=q, papers=paper_dicts)
+
+                # Per-paper calls so each summary can be sent on its own; the
+                # summarizer still batches them together on its side.
+                async def indexed_summary(i: int, p: Paper):
+                    # one failed paper (e.g. the summarizer's 503 backpressure) mustn't end the stream
+                    try:
+                        return i, await summarize_paper(client, p)
+                    except Exception as e:
+                        print("Summarize error:", e)
+                        return i, {**_summary_entry(p), "error": str(e) or type(e).__name__}
+
+                cite_task = asyncio.create_task(
+                    asyncio.wait_for(cite_papers(client, papers), settings.PIPELINE_CITE_DEADLINE or None)
+                )
+                summary_tasks = [asyncio.create_task(indexed_summary(i, p)) for i, p in enumerate(papers)]
+                summaries = [None] * len(papers)
+                try:
+                    for next_done in asyncio.as_completed(
+                        summary_tasks, timeout=settings.PIPELINE_SUMMARIZE_DEADLINE or None
+                    ):
+                        i, summary = await next_done
+                        summaries[i] = summary
+                        yield _ndjson("summary", index=i, **summary)
+                except asyncio.TimeoutError as e:
+                    errors["summarize"] = describe_error(e, settings.PIPELINE_SUMMARIZE_DEADLINE)
+                    for i, p in enumerate(papers):
+                        if summaries[i] is None:
+                            summaries[i] = {**_summary_entry(p), "error": errors["summarize"]}
+                            yield _ndjson("summary", index=i, **summaries[i])
+
+                try:
+                    citations = await cite_task
+                    yield _ndjson("citations", citations=citations)
+                except Exception as e:
+                    # like /api/chat: no citations rather than no answer
+                    print("Cite error:", e)
+                    citations = []
+                    errors["cite"] = describe_error(e, settings.PIPELINE_CITE_DEADLINE)
+                    yield _ndjson("citations", citations=citations, error=errors["cite"])
+
+            messages = build_chat_messages(q, papers, summaries)
+            key = chat_answer_key(q, papers, summaries, 512)
+            cached = answer_cache.get(key)
+            usage = prompt_usage(q, papers, summaries, messages, cached=cached is not None)
+            answer = []
+            if cached is not None:
+                answer.append(cached)
+                yield _ndjson("token", text=cached)
+            else:
+                loop = asyncio.get_running_loop()
+                chat_deadline = loop.time() + settings.PIPELINE_CHAT_DEADLINE if settings.PIPELINE_CHAT_DEADLINE else None
+                tokens = stream_cosmos_rp(messages, max_tokens=512)
+                try:
+                    while True:
+                        timeout = max(0, chat_deadline - loop.time()) if chat_deadline is not None else None
+                        try:
+                            token = await asyncio.wait_for(tokens.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        answer.append(token)
+                        yield _ndjson("token", text=token)
+                except asyncio.TimeoutError as e:
+                    # keep whatever has been streamed; the answer is incomplete, so not cached
+                    errors["chat"] = describe_error(e, settings.PIPELINE_CHAT_DEADLINE)
+                except HTTPException as e:
+                    if e.status_code != 503 or answer:
+                        raise
+                    # Cosmos RP is unavailable (breaker open / rate limited): papers, summaries and
+                    # citations have been sent, so finish as a summaries-only answer
+                    errors["chat"] = e.detail
+                finally:
+                    await tokens.aclose()
+                if "chat" not in errors:
+                    answer_cache.put(key, "".join(answer))
+            yield _ndjson("done", chat_response="".join(answer), errors=errors, usage=usage)
+            if settings.HISTORY_ENABLED:
+                history.record(user.id, q, payload.limit, {
+                    "papers": paper_dicts, "summaries": summaries,
+                    "citations": citations, "chat_response": "".join(answer), "errors": errors,
+                })
+        except HTTPException as e:
+            yield _ndjson("error", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            yield _ndjson("error", status_code=502, detail=str(e))
+        finally:
+            for task in [cite_task, *summary_tasks]:
+                if task and not task.done():
+                    task.cancel()
+
+    async def live_events():
+        with prefetcher.live_request():
+            async for chunk in events():
+                yield chunk
+
+    return StreamingResponse(live_events(), media_type="application/x-ndjson")
@@ -1,3 +1,5 @@
+import time
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from typing import Optional
 
@@ -5,3 +7,43 @@ class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str = Field(index=True)
     hashed_password: str
+
+# Chat history. Composite indexes serve the two hot lookups: a user's recent
+# identical query (user_id, query_norm, created_at) and keyset-paginated
+# history listing (user_id, id).
+class QueryRecord(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_queryrecord_user_norm_created", "user_id", "query_norm", "created_at"),
+        Index("ix_queryrecord_user_id_id", "user_id", "id"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    query: str
+    query_norm: str
+    limit: int
+    complete: bool = True  # every stage succeeded, so the answer may be reused
+    created_at: float = Field(default_factory=time.time)
+
+class QueryPaper(SQLModel, table=True):
+    __table_args__ = (Index("ix_querypaper_query_position", "query_id", "position"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query_id: int = Field(foreign_key="queryrecord.id")
+    position: int
+    paper_id: Optional[str] = None
+    title: Optional[str] = None
+    data: str  # Paper as JSON
+
+class QuerySummary(SQLModel, table=True):
+    __table_args__ = (Index("ix_querysummary_query_position", "query_id", "position"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    query_id: int = Field(foreign_key="queryrecord.id")
+    position: int
+    paper_id: Optional[str] = None
+    summary: str
+    highlights: str  # JSON list
+
+class ChatAnswer(SQLModel, table=True):
+    query_id: int = Field(foreign_key="queryrecord.id", primary_key=True)
+    chat_response: str
+    citations: str  # JSON list
+    errors: str  # JSON object
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+
+@dataclass
+class Stage:
+    """
+    One step of a request pipeline. `run` is called with the results of
+    `deps` as keyword arguments as soon as they are all available. When it
+    fails or misses its deadline, `fallback` (called with the same kwargs)
+    supplies a degraded result, unless the stage is `required`.
+    """
+    name: str
+    run: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    deadline: Optional[float] = None  # seconds, not counting time spent waiting on deps
+    fallback: Optional[Callable[..., Any]] = None
+    required: bool = False
+
+
+@dataclass
+class PipelineRun:
+    results: Dict[str, Any]
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per stage
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: str, detail: str):
+        super().__init__(f"{stage}: {detail}")
+        self.stage = stage
+        self.detail = detail
+
+
+def describe_error(e: Exception, deadline: Optional[float] = None) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return f"timed out after {deadline}s"
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP {e.response.status_code} from {e.request.url}"
+    if isinstance(e, HTTPException):
+        return str(e.detail)
+    return str(e) or e.__class__.__name__
+
+
+class Pipeline:
+    """Runs stages as a dependency graph: every stage starts the moment its inputs are ready."""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on undeclared stages {missing}")
+            self.stages[stage.name] = stage
+
+    async def run(self) -> PipelineRun:
+        run = PipelineRun(results={})
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage):
+            kwargs = {d: await tasks[d] for d in stage.deps}
+            started = time.perf_counter()
+            try:
+                coro = stage.run(**kwargs)
+                if stage.deadline:
+                    return await asyncio.wait_for(coro, stage.deadline)
+                return await coro
+            except Exception as e:
+                run.errors[stage.name] = describe_error(e, stage.deadline)
+                if stage.required:
+                    raise StageFailed(stage.name, run.errors[stage.name])
+                return stage.fallback(**kwargs) if stage.fallback else None
+            finally:
+                run.timings[stage.name] = time.perf_counter() - started
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for t in tasks.values():
+                t.cancel()
+            raise
+        run.results = dict(zip(tasks, results))
+        return run
@@ -0,0 +1,189 @@
+# services/orchestrator/prefetch.py
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common.cache import LRUCache
+from .history import normalize_query
+
+Key = Tuple[str, int]  # (normalized query, limit)
+
+
+@dataclass
+class Precomputed:
+    papers: list  # Paper objects
+    summaries: list
+    citations: list
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class QueryTracker:
+    """
+    Query frequency with exponential decay: each sighting adds 1 to a score
+    that halves every `half_life` seconds, so old bursts stop counting as
+    trending. Keeps at most `max_entries` queries, dropping the lowest scores.
+    """
+
+    def __init__(self, half_life: float = 3600, max_entries: int = 5000):
+        self.half_life = half_life
+        self.max_entries = max(1, max_entries)
+        # key -> [score, updated_at, last raw query]; insertion order = recency
+        self._entries: "OrderedDict[Key, list]" = OrderedDict()
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, query: str, limit: int):
+        now = time.monotonic()
+        key = (normalize_query(query), limit)
+        entry = self._entries.pop(key, None)
+        score = self._decayed(entry, now) + 1 if entry else 1.0
+        self._entries[key] = [score, now, query]
+        if len(self._entries) > self.max_entries:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        keep = sorted(self._entries.items(), key=lambda kv: self._decayed(kv[1], now), reverse=True)
+        keep = dict(keep[: int(self.max_entries * 0.9)])
+        self._entries = OrderedDict((k, v) for k, v in self._entries.items() if k in keep)
+
+    def trending(self, k: int, min_score: float) -> List[Tuple[Key, str]]:
+        now = time.monotonic()
+        scored = [(self._decayed(e, now), key, e[2]) for key, e in self._entries.items()]
+        scored = sorted((s for s in scored if s[0] >= min_score), key=lambda s: s[0], reverse=True)
+        return [(key, query) for _, key, query in scored[:k]]
+
+    def recent(self, k: int) -> List[Tuple[Key, str]]:
+        return [(key, e[2]) for key, e in list(reversed(self._entries.items()))[:k]]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Prefetcher:
+    """
+    Precomputes search results, summaries and citations for trending and
+    recently seen queries, so the next /api/chat for them skips those stages.
+
+    A background task wakes every `interval` seconds and works through the
+    candidates that have no fresh result, one at a time. It waits while more
+    than `max_live` live chat requests are in flight, and after each query it
+    sleeps long enough that prefetching takes at most `budget` of wall time
+    (the summarizer's CPU is where the cost lands, and it is shared with
+    live traffic).
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[str, int], Awaitable[Precomputed]],
+        interval: float = 30,
+        ttl: float = 900,
+        top_k: int = 10,
+        recent_k: int = 5,
+        min_score: float = 2,
+        budget: float = 0.1,
+        max_live: int = 0,
+        max_entries: int = 500,
+        half_life: float = 3600,
+        track_size: int = 5000,
+    ):
+        self.compute = compute
+        self.interval = interval
+        self.ttl = ttl
+        self.top_k = top_k
+        self.recent_k = recent_k
+        self.min_score = min_score
+        self.budget = min(1.0, max(0.01, budget))
+        self.max_live = max_live
+        self.tracker = QueryTracker(half_life, track_size)
+        self._results = LRUCache(max_entries, name="prefetch")
+        self._task: Optional[asyncio.Task] = None
+        self.live = 0
+        self.prefetched = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def start(self):
+        if self._task is None:
+            self.started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def record(self, query: str, limit: int):
+        self.tracker.record(query, limit)
+
+    @contextmanager
+    def live_request(self):
+        """Wrap live chat requests so the worker can tell when the service is idle."""
+        self.live += 1
+        try:
+            yield
+        finally:
+            self.live -= 1
+
+    def get(self, query: str, limit: int) -> Optional[Precomputed]:
+        """Precomputed result for a live request, counted towards the hit rate."""
+        return self._results.get((normalize_query(query), limit))
+
+    def candidates(self) -> List[Tuple[Key, str]]:
+        """Trending first, then recent; skipping queries with a result that is still fresh for half its TTL."""
+        out: Dict[Key, str] = {}
+        for key, query in self.tracker.trending(self.top_k, self.min_score) + self.tracker.recent(self.recent_k):
+            entry = self._results.peek(key)
+            if key not in out and (entry is None or time.monotonic() - entry.created_at > self.ttl / 2):
+                out[key] = query
+        return list(out.items())
+
+    async def _wait_idle(self):
+        while self.live > self.max_live:
+            await asyncio.sleep(0.2)
+
+    async def prefetch(self, key: Key, query: str):
+        await self._wait_idle()
+        t0 = time.monotonic()
+        try:
+            result = await self.compute(query, key[1])
+        except Exception as e:
+            self.failed += 1
+            print("Prefetch error:", e)
+        else:
+            self._results.put(key, result, expires=result.created_at + self.ttl)
+            self.prefetched += 1
+        spent = time.monotonic() - t0
+        self.busy_seconds += spent
+        await asyncio.sleep(spent * (1 - self.budget) / self.budget)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for key, query in self.candidates():
+                await self.prefetch(key, query)
+
+    def stats(self) -> dict:
+        results = self._results.stats()
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "tracked_queries": len(self.tracker),
+            "precomputed": len(self._results),
+            "prefetched": self.prefetched,
+            "failed": self.failed,
+            "busy_fraction": self.busy_seconds / elapsed if elapsed else 0.0,
+            "budget": self.budget,
+            "live_in_flight": self.live,
+            "hits": results["hits"],
+            "misses": results["misses"],
+            "hit_rate": results["hit_rate"],
+        }
@@ -0,0 +1,130 @@
+# services/orchestrator/prompt.py
+import hashlib
+import json
+import re
+from typing import List, Optional
+
+from common.cache import LRUCache
+from common.schemas import Paper
+from .history import normalize_query
+
+# Bump when the prompt format changes, so cached answers to the old prompt are not reused
+PROMPT_VERSION = "compact-1"
+
+# Same rules as main.SYSTEM_PROMPT in roughly a third of the tokens
+COMPACT_SYSTEM_PROMPT = (
+    "You are a concise, friendly research assistant. Answer from the papers and summaries given; "
+    "be accurate, clear and professional.\n"
+    "Emojis: 0-3 per reply, inline, only where they add clarity "
+    "(🔍 research, 📄 papers, 💡 ideas, ✅ success, ⚠️ warnings, 🔗 links, 📚 references, 👍 encouragement). "
+    "Prefix each listed paper with 📄 or 📚. No emojis on sensitive topics (medical, legal, health, finance) "
+    "unless asked; then only neutral ones like ⚠️, with a professional note."
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cosmos RP's tokenizer isn't available here; ~4 characters per token is close for English BPE vocabularies."""
+    return (len(text) + 3) // 4
+
+
+def count_prompt_tokens(messages: list) -> int:
+    """Estimated prompt size of a chat request, counting a few tokens of per-message framing."""
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def _clean(text: Optional[str]) -> str:
+    return " ".join((text or "").split())
+
+
+def trim_to_tokens(text: str, budget: int) -> str:
+    """Whole sentences while they fit, else whole words, marking the cut with an ellipsis."""
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+    out = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{out} {sentence}".strip()
+        if estimate_tokens(candidate) > budget:
+            break
+        out = candidate
+    if not out:
+        words = []
+        for word in text.split():
+            if estimate_tokens(" ".join(words + [word]) + "…") > budget:
+                break
+            words.append(word)
+        out = " ".join(words)
+    return out + "…"
+
+
+def _paper_line(i: int, p: Paper) -> str:
+    authors = p.authors or []
+    who = f"{authors[0]} et al." if len(authors) > 1 else (authors[0] if authors else "")
+    meta = "; ".join(str(x) for x in (p.year, who) if x)
+    return f"[{i}] {_clean(p.title) or 'Untitled'}" + (f" ({meta})" if meta else "")
+
+
+def serialize_context(q: str, papers: List[Paper], summaries: list, budget: int) -> str:
+    """
+    Compact, deterministic user message: one header line per paper and its
+    summary, with summaries trimmed so the whole message fits `budget`
+    tokens. Short summaries keep their full text and leave the rest of their
+    share to longer ones.
+    """
+    by_paper = {s.get("paper_id"): s for s in summaries if isinstance(s, dict)}
+    texts = []
+    for i, p in enumerate(papers):
+        s = summaries[i] if i < len(summaries) and isinstance(summaries[i], dict) else by_paper.get(p.id, {})
+        texts.append(_clean(s.get("summary")) or _clean(p.abstract))
+
+    header = f"Query: {_clean(q)}\nPapers ({len(papers)}):"
+    lines = [_paper_line(i + 1, p) for i, p in enumerate(papers)]
+    remaining = budget - estimate_tokens(header) - sum(estimate_tokens(line) + 1 for line in lines)
+
+    # water-fill the budget: shortest summaries first, each gets at most an equal share of what's left
+    shares = [0] * len(texts)
+    order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+    for n, i in enumerate(order):
+        share = max(0, remaining // (len(order) - n))
+        shares[i] = min(estimate_tokens(texts[i]), share)
+        remaining -= shares[i]
+
+    body = [header]
+    for line, text, share in zip(lines, texts, shares):
+        body.append(line)
+        trimmed = trim_to_tokens(text, share)
+        if trimmed:
+            body.append(trimmed)
+    return "\n".join(body)
+
+
+def answer_key(q: str, papers: List[Paper], summaries: list, max_tokens: int, version: str = PROMPT_VERSION) -> str:
+    """Normalized query + ordered paper ids + a digest of each summary: identical context, identical key."""
+    digests = []
+    for i, p in enumerate(papers):
+        s = summaries[i] if i < len(summaries) and isinstance(summaries[i], dict) else {}
+        digests.append([p.id or _clean(p.title), hashlib.sha1(_clean(s.get("summary")).encode()).hexdigest()[:12]])
+    raw = json.dumps([version, normalize_query(q), digests, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class AnswerCache:
+    """LRU + TTL cache of Cosmos RP answers by `answer_key`."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.ttl = ttl
+        self._lru = LRUCache(max_entries, name="chat_answer")
+
+    def get(self, key: str) -> Optional[str]:
+        return self._lru.get(key)
+
+    def put(self, key: str, answer: str):
+        if not answer or self.ttl <= 0:
+            return
+        self._lru.put(key, answer, ttl=self.ttl)
+
+    def stats(self) -> dict:
+        return self._lru.stats()
@@ -0,0 +1,79 @@
+# services/search_agent/arxiv.py
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, List
+
+from common.config import settings
+from common.http import get_client
+from common.scheduler import get_upstream
+from common.telemetry import observe_upstream
+from common.schemas import Paper
+
+ARXIV_API = settings.ARXIV_API_URL
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _text(elem: ET.Element, tag: str) -> str:
+    child = elem.find(ATOM + tag)
+    if child is None or child.text is None:
+        return ""
+    return " ".join(child.text.split())  # arXiv wraps titles/abstracts across lines
+
+
+def parse_arxiv_entry(entry: ET.Element) -> Paper:
+    arxiv_id = _text(entry, "id").split("/abs/")[-1]
+    authors = [_text(a, "name") for a in entry.findall(ATOM + "author")]
+    url = None
+    for link in entry.findall(ATOM + "link"):
+        if link.get("rel", "alternate") == "alternate":
+            url = link.get("href")
+            break
+    published = _text(entry, "published")
+    return Paper(
+        id=arxiv_id,
+        title=_text(entry, "title"),
+        abstract=_text(entry, "summary"),
+        year=int(published[:4]) if published[:4].isdigit() else None,
+        authors=authors,
+        url=url,
+        arxiv_id=arxiv_id,
+        external_ids={"ArXiv": arxiv_id}
+    )
+
+
+async def iter_arxiv(query: str, max_results: int = 5) -> AsyncIterator[Paper]:
+    """
+    Stream the arXiv Atom feed and yield each Paper as soon as its <entry>
+    has been received, dropping parsed entries so memory stays flat.
+    """
+    params = {"search_query": f"all:{query}", "start": 0, "max_results": max_results}
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    client = get_client()
+    r = await get_upstream("arxiv").call(
+        lambda: client.send(client.build_request("GET", ARXIV_API, params=params, timeout=settings.ARXIV_TIMEOUT), stream=True)
+    )
+    try:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    continue
+                if elem.tag != ATOM + "entry":
+                    continue
+                try:
+                    yield parse_arxiv_entry(elem)
+                except Exception as e:
+                    print("arXiv parse error:", e)
+                finally:
+                    root.remove(elem)
+    finally:
+        await r.aclose()
+    parser.close()
+
+
+async def search_arxiv(query: str, max_results: int = 5) -> List[Paper]:
+    with observe_upstream("arxiv"):
+        return [p async for p in iter_arxiv(query, max_results=max_results)]
@@ -0,0 +1,65 @@
+# services/search_agent/cache.py
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from common.cache import LRUCache
+from common.schemas import Paper
+
+
+Key = Tuple[str, int, str]
+
+
+def make_key(query: str, limit: int, mode: str = "default") -> Key:
+    """Case- and whitespace-insensitive key so trivially different queries share an entry."""
+    return (" ".join(query.lower().split()), limit, mode)
+
+
+class SearchCache:
+    """
+    TTL cache of search results with single-flight coalescing: concurrent
+    misses for the same key share one upstream fetch. Empty results are
+    cached too, but only for `negative_ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600, negative_ttl: float = 30):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lru = LRUCache(max_entries, name="search")
+        self._inflight: Dict[Key, asyncio.Task] = {}
+
+    def get(self, key) -> Optional[List[Paper]]:
+        return self._lru.get(key, count=False)
+
+    def put(self, key, papers: List[Paper]):
+        ttl = self.ttl if papers else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._lru.put(key, papers, ttl=ttl)
+
+    async def get_or_fetch(self, key, fetch: Callable[[], Awaitable[List[Paper]]]) -> List[Paper]:
+        papers = self.get(key)
+        if papers is not None:
+            self._lru.record("hit")
+            return papers
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._lru.record("coalesced")
+        else:
+            self._lru.record("miss")
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+        # shield so one cancelled caller doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            papers = await fetch()
+            self.put(key, papers)
+            return papers
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        # a coalesced lookup waited on another caller's fetch: counted as a hit
+        return {**self._lru.stats(), "inflight": len(self._inflight), "coalesced": self._lru.lookups.get("coalesced", 0)}
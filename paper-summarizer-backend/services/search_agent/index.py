@@ -0,0 +1,134 @@
+# services/search_agent/index.py
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from common.schemas import Paper
+
+
+def paper_text(p: Paper) -> str:
+    return f"{p.title or ''}. {p.abstract or ''}".strip()
+
+
+class Embedder:
+    """Lazily loaded sentence-transformers model producing unit-length float32 vectors."""
+
+    def __init__(self, model_name: str, batch_size: int = 64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = threading.Lock()  # first use loads (maybe downloads) the model once
+        self._lock = threading.Lock()  # one inference at a time
+
+    def _get_model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        model = self._get_model()
+        with self._lock:
+            vectors = model.encode(
+                texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+            )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingIndex:
+    """
+    Append-only vector index: an (N, dim) float32 matrix in a flat file,
+    memory-mapped for search, plus the store rowid of each vector.
+    Vectors are unit length, so a dot product is cosine similarity.
+    A paper re-embedded after an update keeps its old vector in the file;
+    only the last vector per rowid is searched.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._rowids_path = os.path.join(directory, "rowids.i64")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self.dim: Optional[int] = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        self._lock = threading.Lock()
+        # (matrix, rowids, superseded mask or None), swapped as one reference so an unlocked
+        # search never pairs a new matrix with old rowids
+        self._data: Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = None
+        self._open()
+
+    def _count(self) -> int:
+        """Vectors in the files, ignoring a torn trailing write on either."""
+        if not os.path.exists(self._vectors_path) or not os.path.exists(self._rowids_path):
+            return 0
+        return min(os.path.getsize(self._rowids_path) // 8, os.path.getsize(self._vectors_path) // (4 * self.dim))
+
+    def _open(self):
+        if not self.dim or not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) == 0:
+            self._data = None
+            return
+        n = self._count()
+        if n == 0:
+            self._data = None
+            return
+        matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        rowids = np.fromfile(self._rowids_path, dtype=np.int64, count=n)
+        # last occurrence of each rowid wins; earlier vectors are from before an update
+        _, first_in_reversed = np.unique(rowids[::-1], return_index=True)
+        superseded = None
+        if len(first_in_reversed) < n:
+            superseded = np.ones(n, dtype=bool)
+            superseded[n - 1 - first_in_reversed] = False
+        self._data = (matrix, rowids, superseded)
+
+    def __len__(self) -> int:
+        data = self._data
+        return 0 if data is None else len(data[1])
+
+    def rowids(self) -> set:
+        data = self._data
+        return set() if data is None else {int(r) for r in data[1]}
+
+    def add(self, rowids: List[int], vectors: np.ndarray):
+        if not len(rowids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w") as f:
+                    json.dump({"dim": self.dim}, f)
+            # cut both files back to the same count first, so a write torn by a crash
+            # can't leave every later append with vectors and rowids out of step
+            n = self._count()
+            for path, size in ((self._vectors_path, n * self.dim * 4), (self._rowids_path, n * 8)):
+                with open(path, "ab") as f:
+                    f.truncate(size)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._rowids_path, "ab") as f:
+                f.write(np.asarray(rowids, dtype=np.int64).tobytes())
+            self._open()
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Top-k (rowid, cosine similarity), best first, scored against each rowid's latest vector."""
+        data = self._data
+        if data is None or k <= 0:
+            return []
+        matrix, rowids, superseded = data
+        scores = matrix @ query.astype(np.float32)
+        live = len(scores)
+        if superseded is not None:
+            scores[superseded] = -np.inf
+            live -= int(superseded.sum())
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rowids[i]), float(scores[i])) for i in top]
@@ -0,0 +1,218 @@
+"""
+Bulk-load paper metadata dumps into the search agent's local paper store.
+
+    python -m services.search_agent.ingest arxiv-metadata-oai-snapshot.json --format arxiv-jsonl --embed
+    python -m services.search_agent.ingest papers.jsonl --format s2-jsonl --checkpoint s2.ckpt
+    python -m services.search_agent.ingest feed.xml --format atom
+
+Input is streamed with constant memory and written in batched transactions.
+After every batch a checkpoint is saved, so re-running the same command
+resumes where the previous run stopped.
+"""
+import argparse
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional, Tuple
+
+from common.config import settings
+from common.schemas import Paper
+from .arxiv import ATOM, parse_arxiv_entry
+from .index import Embedder, EmbeddingIndex
+from .library import embed_pending
+from .merge import merge_papers
+from .store import PaperStore
+
+# Each reader yields (paper or None, resume position after this record)
+Record = Tuple[Optional[Paper], int]
+
+
+def _clean(text: Optional[str]) -> Optional[str]:
+    return " ".join(text.split()) if text else text
+
+
+def map_arxiv_record(rec: dict) -> Paper:
+    """One record of the arXiv metadata snapshot (Kaggle `arxiv-metadata-oai-snapshot.json`)."""
+    arxiv_id = rec["id"]
+    if rec.get("authors_parsed"):
+        authors = [" ".join(p for p in (a[1], a[0]) if p) for a in rec["authors_parsed"]]
+    else:
+        authors = [a.strip() for a in (rec.get("authors") or "").replace(" and ", ", ").split(",") if a.strip()]
+    year = None
+    versions = rec.get("versions") or []
+    if versions and versions[0].get("created"):
+        year = int(versions[0]["created"].split()[3])  # "Mon, 2 Apr 2007 19:18:42 GMT"
+    elif rec.get("update_date"):
+        year = int(rec["update_date"][:4])
+    external_ids = {"ArXiv": arxiv_id}
+    if rec.get("doi"):
+        external_ids["DOI"] = rec["doi"].split()[0]
+    return Paper(
+        id=arxiv_id,
+        title=_clean(rec.get("title")),
+        abstract=_clean(rec.get("abstract")),
+        year=year,
+        authors=authors,
+        url=f"https://arxiv.org/abs/{arxiv_id}",
+        arxiv_id=arxiv_id,
+        external_ids=external_ids,
+    )
+
+
+def map_s2_record(rec: dict) -> Paper:
+    """A Semantic Scholar paper record, from the Graph API or the bulk datasets (lower-case keys)."""
+    ext = rec.get("externalIds") or rec.get("externalids") or {}
+    ext = {k: str(v) for k, v in ext.items() if v}
+    paper_id = rec.get("paperId") or rec.get("paperid") or rec.get("corpusid")
+    return Paper(
+        id=str(paper_id) if paper_id is not None else None,
+        title=_clean(rec.get("title")),
+        abstract=_clean(rec.get("abstract")),
+        year=rec.get("year"),
+        authors=[a.get("name") for a in rec.get("authors") or [] if a.get("name")],
+        url=rec.get("url"),
+        arxiv_id=ext.get("ArXiv"),
+        external_ids=ext or None,
+    )
+
+
+def read_jsonl(path: str, mapper, offset: int) -> Iterator[Record]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield mapper(json.loads(line)), offset
+            except Exception as e:
+                print(f"Skipping bad record at byte {offset}: {e}")
+                yield None, offset
+
+
+def read_atom(path: str, skip: int) -> Iterator[Record]:
+    """Atom feeds are resumed by entry count, since the parser can't seek."""
+    n = 0
+    root = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag != ATOM + "entry":
+            continue
+        n += 1
+        if n > skip:
+            try:
+                yield parse_arxiv_entry(elem), n
+            except Exception as e:
+                print(f"Skipping bad entry #{n}: {e}")
+                yield None, n
+        root.remove(elem)
+
+
+def load_checkpoint(path: str, source: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            ckpt = json.load(f)
+        if ckpt.get("source") == os.path.abspath(source):
+            return ckpt
+        print(f"Checkpoint {path} belongs to {ckpt.get('source')}, starting from the beginning")
+    return {"source": os.path.abspath(source), "position": 0, "read": 0, "inserted": 0, "updated": 0, "skipped": 0}
+
+
+def save_checkpoint(path: str, ckpt: dict):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, path)  # atomic: a crash never leaves a half-written checkpoint
+
+
+def ingest(source: str, fmt: str, store: PaperStore, batch_size: int, checkpoint: str,
+           index: Optional[EmbeddingIndex] = None, embedder: Optional[Embedder] = None,
+           limit: Optional[int] = None) -> dict:
+    ckpt = load_checkpoint(checkpoint, source)
+    if fmt == "atom":
+        records = read_atom(source, ckpt["position"])
+    else:
+        records = read_jsonl(source, map_arxiv_record if fmt == "arxiv-jsonl" else map_s2_record, ckpt["position"])
+
+    started = time.perf_counter()
+    read_this_run = 0
+
+    def flush(batch: List[Paper], position: int):
+        if batch:
+            # Duplicates within the batch are merged here; the store merges across batches
+            merged = merge_papers(batch)
+            ckpt["skipped"] += len(batch) - len(merged)
+            batch = merged
+            results = store.upsert_many(batch)
+            ckpt["inserted"] += sum(1 for _, inserted, _ in results if inserted)
+            ckpt["updated"] += sum(1 for _, inserted, changed in results if changed and not inserted)
+        if index is not None and embedder is not None:
+            # every row without a current vector, not just this batch's: a crashed run may have
+            # committed rows it never indexed
+            embed_pending(store, index, embedder, embedder.batch_size)
+        ckpt["position"] = position
+        save_checkpoint(checkpoint, ckpt)
+        elapsed = time.perf_counter() - started
+        print(f"read={ckpt['read']} inserted={ckpt['inserted']} updated={ckpt['updated']} "
+              f"skipped={ckpt['skipped']} rate={read_this_run / max(elapsed, 1e-9):.0f} records/s")
+
+    batch: List[Paper] = []
+    position = ckpt["position"]
+    for paper, position in records:
+        ckpt["read"] += 1
+        read_this_run += 1
+        if paper is None or not (paper.title or paper.id):
+            ckpt["skipped"] += 1
+        else:
+            batch.append(paper)
+        if len(batch) >= batch_size:
+            flush(batch, position)
+            batch = []
+        if limit and read_this_run >= limit:
+            break
+    flush(batch, position)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **ckpt,
+        "read_this_run": read_this_run,
+        "seconds": elapsed,
+        "records_per_second": read_this_run / max(elapsed, 1e-9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="path to the dump file")
+    parser.add_argument("--format", choices=["arxiv-jsonl", "s2-jsonl", "atom"], default="arxiv-jsonl")
+    parser.add_argument("--store", default=settings.PAPER_STORE_PATH, help="paper store SQLite path")
+    parser.add_argument("--index-dir", default=settings.PAPER_INDEX_DIR)
+    parser.add_argument("--embed", action="store_true", help="also embed new papers, and any stored earlier without a vector, into the vector index")
+    parser.add_argument("--batch-size", type=int, default=5000, help="papers per transaction")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <source>.ckpt)")
+    parser.add_argument("--limit", type=int, help="stop after this many records")
+    args = parser.parse_args()
+
+    store = PaperStore(args.store)
+    index = embedder = None
+    if args.embed:
+        index = EmbeddingIndex(args.index_dir)
+        embedder = Embedder(settings.EMBEDDING_MODEL, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    try:
+        report = ingest(
+            args.source, args.format, store, args.batch_size,
+            args.checkpoint or args.source + ".ckpt", index, embedder, args.limit,
+        )
+    finally:
+        store.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# services/search_agent/library.py
+import asyncio
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from common.schemas import Paper
+from .index import Embedder, EmbeddingIndex, paper_text
+from .store import PaperStore
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        print("Paper store error:", task.exception())
+
+
+def embed_pending(store: PaperStore, index: EmbeddingIndex, embedder: Embedder,
+                  batch_size: int = 256, max_rows: Optional[int] = None) -> int:
+    """
+    Embed stored papers that have no current vector in the index: rows
+    stored while embedding failed, rows changed since they were embedded, or
+    rows committed by a run that crashed before indexing them. Blocking;
+    returns the number of rows embedded.
+    """
+    if store.needs_reconcile:
+        store.mark_indexed(index.rowids())
+    done = 0
+    while max_rows is None or done < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - done)
+        rows = store.unembedded(limit=limit)
+        if not rows:
+            break
+        vectors = embedder.encode([paper_text(p) for _, _, p in rows])
+        index.add([rowid for rowid, _, _ in rows], vectors)
+        store.mark_embedded([(rowid, updated) for rowid, updated, _ in rows])
+        done += len(rows)
+    return done
+
+
+class PaperLibrary:
+    """
+    Local corpus of previously seen papers: the SQLite store (with its BM25
+    keyword index) plus an embedding index over title + abstract. All blocking work (model, SQLite,
+    matrix search) runs in threads.
+    """
+
+    def __init__(self, store: PaperStore, index: EmbeddingIndex, embedder: Embedder):
+        self.store = store
+        self.index = index
+        self.embedder = embedder
+        self._background: Set[asyncio.Task] = set()
+
+    async def warm_up(self):
+        await asyncio.to_thread(self.embedder.encode, ["warm-up"])
+        await self.catch_up()
+
+    async def catch_up(self):
+        """Index papers that were stored without a vector."""
+        try:
+            n = await asyncio.to_thread(embed_pending, self.store, self.index, self.embedder, self.embedder.batch_size)
+        except Exception as e:
+            print("Embedding error:", e)
+            return
+        if n:
+            print(f"Embedded {n} papers that were missing from the index")
+
+    async def search(self, query: str, limit: int, min_score: float = 0.0) -> List[Tuple[Paper, float]]:
+        if not len(self.index):
+            return []
+        qvec = (await asyncio.to_thread(self.embedder.encode, [query]))[0]
+        hits = await asyncio.to_thread(self.index.search, qvec, limit)
+        papers = await asyncio.to_thread(self.store.get_many, [rowid for rowid, _ in hits])
+        found = [(papers[rowid], score) for rowid, score in hits if rowid in papers and score >= min_score]
+        return found[:limit]
+
+    def _persist(self, papers: List[Paper], vectors: Optional[np.ndarray]):
+        results = self.store.upsert_many(papers)
+        if vectors is None:
+            return  # stored unembedded; picked up by catch_up
+        position = {rowid: i for i, (rowid, _, _) in enumerate(results) if rowid}
+        # new and changed rows, plus any that were stored earlier without a vector
+        pending = self.store.unembedded(list(position))
+        if pending:
+            self.index.add([rowid for rowid, _, _ in pending], vectors[[position[rowid] for rowid, _, _ in pending]])
+            self.store.mark_embedded([(rowid, updated) for rowid, updated, _ in pending])
+
+    def _in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(_log_failure)
+
+    async def keyword_search(self, query: str, limit: int) -> List[Tuple[Paper, float]]:
+        return await asyncio.to_thread(self.store.keyword_search, query, limit)
+
+    async def add(self, papers: List[Paper], vectors: Optional[np.ndarray] = None):
+        """
+        Store papers and index the new or changed ones (embedding them unless
+        `vectors` is given). If embedding fails the papers are still stored,
+        so keyword search finds them.
+        """
+        if not papers:
+            return
+        if vectors is None:
+            try:
+                vectors = await asyncio.to_thread(self.embedder.encode, [paper_text(p) for p in papers])
+            except Exception as e:
+                print("Embedding error:", e)
+        await asyncio.to_thread(self._persist, papers, vectors)
+
+    async def rank_and_add(self, query: str, papers: List[Paper], rerank: bool = True) -> List[Paper]:
+        """
+        Embed the query and papers in one batch, optionally reorder the papers
+        by similarity to the query, and persist them in the background.
+        """
+        try:
+            vectors = await asyncio.to_thread(self.embedder.encode, [query] + [paper_text(p) for p in papers])
+        except Exception as e:
+            print("Embedding error:", e)
+            self._in_background(asyncio.to_thread(self._persist, papers, None))
+            return papers
+        qvec, pvecs = vectors[0], vectors[1:]
+        self._in_background(self.add(papers, pvecs))
+
+        if not rerank:
+            return papers
+        scores = pvecs @ qvec
+        order = sorted(range(len(papers)), key=lambda i: -scores[i])
+        return [papers[i] for i in order]
+
+    def stats(self) -> dict:
+        return {"papers": self.store.count(), "vectors": len(self.index)}
+
+    async def close(self):
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        self.store.close()
@@ -1,17 +1,54 @@
 # services/search_agent/main.py
 import os
+import asyncio
 import httpx
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-import urllib.parse
-from typing import List
-import feedparser
+from typing import Dict, List
 from common.schemas import Paper, SearchRequest, SearchResponse
 from common.config import settings
 from common.utils import sanitize_text
+from common.http import start_client, close_client, get_client
+from common.telemetry import install_metrics, observe_upstream
+from common.scheduler import get_upstream, upstream_stats
+from common.wire import WireRoute, dump_papers, wire_response
 from fastapi.middleware.cors import CORSMiddleware
+from .cache import SearchCache, make_key
+from .arxiv import search_arxiv
+from .merge import merge_papers, reciprocal_rank_fusion
+from .index import Embedder, EmbeddingIndex
+from .store import PaperStore
+from .library import PaperLibrary
 
-app = FastAPI(title="Search Agent")
+# Local corpus of every paper seen so far; None when PAPER_STORE_PATH is empty
+library: PaperLibrary | None = None
+
+def open_library() -> PaperLibrary | None:
+    if not settings.PAPER_STORE_PATH:
+        return None
+    return PaperLibrary(
+        PaperStore(settings.PAPER_STORE_PATH),
+        EmbeddingIndex(settings.PAPER_INDEX_DIR),
+        Embedder(settings.EMBEDDING_MODEL, batch_size=settings.EMBEDDING_BATCH_SIZE),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global library
+    await start_client()
+    library = open_library()
+    warm_up = asyncio.create_task(library.warm_up()) if library else None
+    yield
+    if warm_up:
+        warm_up.cancel()
+    if library:
+        await library.close()
+    await close_client()
+
+app = FastAPI(title="Search Agent", lifespan=lifespan)
+app.router.route_class = WireRoute  # JSON via orjson, msgpack on request
+install_metrics(app, "search_agent")
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,7 +58,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-SEMANTIC_BASE = "https://api.semanticscholar.org/graph/v1"
+SEMANTIC_BASE = settings.SEMANTIC_SCHOLAR_URL
+
+cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_SIZE,
+    ttl=settings.SEARCH_CACHE_TTL,
+    negative_ttl=settings.SEARCH_CACHE_NEGATIVE_TTL,
+)
 
 async def call_semantic_scholar(query: str, limit: int=5):
     fields = "title,abstract,authors,year,url,externalIds"
@@ -30,10 +73,14 @@ async def call_semantic_scholar(query: str, limit: int=5):
     headers = {}
     if settings.SEMANTIC_SCHOLAR_API_KEY:
         headers["x-api-key"] = settings.SEMANTIC_SCHOLAR_API_KEY
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.get(url, params=params, headers=headers)
+    client = get_client()
+    with observe_upstream("semantic_scholar"):
+        # rate limited, retried; raises UpstreamUnavailable while the breaker is open (-> arXiv fallback)
+        r = await get_upstream("semantic_scholar").call(
+            lambda: client.get(url, params=params, headers=headers, timeout=settings.SEMANTIC_SCHOLAR_TIMEOUT)
+        )
         r.raise_for_status()
-        return r.json()
+    return r.json()
 
 def parse_semantic_hit(hit) -> Paper:
     authors = [a.get("name") for a in hit.get("authors", [])]
@@ -50,48 +97,25 @@ def parse_semantic_hit(hit) -> Paper:
         external_ids=ext
     )
 
-def search_arxiv(query: str, max_results: int=5):
-    q = f"all:{query}"
-    url = f"http://export.arxiv.org/api/query?search_query={q}&start=0&max_results={max_results}"
-    feed = feedparser.parse(url)
-    papers = []
-    for entry in feed.entries:
-        authors = [a.name for a in entry.authors] if hasattr(entry, "authors") else []
-        arxiv_id = entry.id.split('/abs/')[-1]
-        abstract = entry.summary
-        papers.append(Paper(
-            id=arxiv_id,
-            title=entry.title,
-            abstract=abstract,
-            year=int(entry.published[:4]),
-            authors=authors,
-            url=entry.link,
-            arxiv_id=arxiv_id,
-            external_ids={"ArXiv": arxiv_id}
-        ))
+async def search_semantic_scholar(q: str, limit: int) -> List[Paper]:
+    papers: List[Paper] = []
+    data = await call_semantic_scholar(q, limit=limit)
+    hits = data.get("data", [])
+    for h in hits:
+        try:
+            papers.append(parse_semantic_hit(h))
+        except Exception as e:
+            print("Semantic Scholar parse error:", e)
     return papers
 
-@app.post("/search", response_model=SearchResponse)
-async def search(req: SearchRequest):
-    q = sanitize_text(req.query)
-    if not q:
-        raise HTTPException(status_code=400, detail="Empty query")
-
+async def fetch_papers_sequential(q: str, limit: int) -> List[Paper]:
     papers: List[Paper] = []
 
-    encoded_query = urllib.parse.quote(q)  # ✅ encode spaces & special symbols
-
     # ✅ Try Semantic Scholar first (with safer error handling)
     try:
-        data = await call_semantic_scholar(q, limit=req.limit)
-        hits = data.get("data", [])
-        for h in hits:
-            try:
-                papers.append(parse_semantic_hit(h))
-            except Exception as e:
-                print("Semantic Scholar parse error:", e)
+        papers = await search_semantic_scholar(q, limit)
         if papers:  # ✅ if results exist, return immediately
-            return SearchResponse(papers=papers)
+            return papers
     except httpx.RequestError as e:
         print("Semantic Scholar network error:", e)
     except Exception as e:
@@ -99,10 +123,128 @@ async def search(req: SearchRequest):
 
     # ✅ Fallback to arXiv
     try:
-        papers += search_arxiv(encoded_query, max_results=req.limit)  # ✅ encoded
+        papers += await search_arxiv(q, max_results=limit)  # ✅ streamed, non-blocking
     except Exception as e:
         print("arXiv search error:", e)
 
-    # Always return a SearchResponse (can be empty)
-    return SearchResponse(papers=papers)
+    return papers
+
+def _task_papers(name: str, task: asyncio.Task) -> List[Paper]:
+    if task.cancelled():
+        return []
+    if task.exception():
+        print(f"{name} search error:", task.exception())
+        return []
+    return task.result()
+
+async def fetch_papers_hedged(q: str, limit: int) -> List[Paper]:
+    """
+    Start Semantic Scholar, hedge with arXiv if it hasn't answered within
+    SEARCH_HEDGE_DELAY_MS, and return as soon as either source has papers,
+    merged with whatever else has already finished. A source that comes back
+    empty never cuts the other short: an empty result is cached as a miss.
+    """
+    tasks = {"Semantic Scholar": asyncio.create_task(search_semantic_scholar(q, limit))}
+
+    await asyncio.wait(tasks.values(), timeout=settings.SEARCH_HEDGE_DELAY_MS / 1000)
+    results: Dict[str, List[Paper]] = {}
+    primary = tasks["Semantic Scholar"]
+    if primary.done():
+        results["Semantic Scholar"] = _task_papers("Semantic Scholar", primary)
+        if results["Semantic Scholar"]:
+            return results["Semantic Scholar"]
+
+    tasks["arXiv"] = asyncio.create_task(search_arxiv(q, max_results=limit))
+    pending = {t for name, t in tasks.items() if name not in results}
+    while pending and not any(results.values()):
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for name, t in tasks.items():
+            if t in done:
+                results[name] = _task_papers(name, t)
+    for t in pending:
+        t.cancel()
+
+    # Semantic Scholar first: its ranking wins and arXiv only fills gaps
+    ordered = [results[name] for name in tasks if name in results]
+    return merge_papers(*ordered)[:limit]
+
+async def fetch_papers(q: str, limit: int) -> List[Paper]:
+    if settings.SEARCH_STRATEGY == "hedged":
+        return await fetch_papers_hedged(q, limit)
+    return await fetch_papers_sequential(q, limit)
+
+async def search_keyword(q: str, limit: int) -> List[Paper]:
+    if not library:
+        return []
+    try:
+        return [p for p, _ in await library.keyword_search(q, limit)]
+    except Exception as e:
+        print("Keyword search error:", e)
+        return []
+
+async def search_local(q: str, limit: int) -> List[Paper]:
+    """Vector and keyword search over the local corpus, fused."""
+    if not library:
+        return []
+    try:
+        semantic = [p for p, _ in await library.search(q, limit)]
+    except Exception as e:
+        print("Local search error:", e)
+        semantic = []
+    keyword = await search_keyword(q, limit)
+    return reciprocal_rank_fusion(semantic, keyword, k=settings.SEARCH_RRF_K)[:limit]
+
+async def fetch_with_library(q: str, limit: int) -> List[Paper]:
+    """
+    Answer from the local corpus when it already holds `limit` close matches;
+    otherwise search upstream, re-rank by embedding similarity and remember the results.
+    With SEARCH_OFFLINE the local corpus is the only source.
+    """
+    if settings.SEARCH_OFFLINE:
+        return await search_local(q, limit)
+
+    if library and settings.LOCAL_SEARCH_FIRST:
+        try:
+            local = await library.search(q, limit, min_score=settings.LOCAL_SEARCH_MIN_SCORE)
+            if len(local) >= limit:
+                return [p for p, _ in local]
+        except Exception as e:
+            print("Local search error:", e)
+
+    papers = await fetch_papers(q, limit)
+    if library and papers:
+        try:
+            papers = await library.rank_and_add(q, papers, rerank=settings.SEARCH_RERANK)
+        except Exception as e:
+            print("Re-rank error:", e)
+    return papers
+
+async def fetch_fused(q: str, limit: int) -> List[Paper]:
+    """Local BM25 and upstream rankings fused, so exact-term matches surface next to semantic hits."""
+    upstream, keyword = await asyncio.gather(fetch_with_library(q, limit), search_keyword(q, limit))
+    return reciprocal_rank_fusion(upstream, keyword, k=settings.SEARCH_RRF_K)[:limit]
+
+@app.post("/search", response_model=SearchResponse)
+async def search(req: SearchRequest, request: Request):
+    q = sanitize_text(req.query)
+    if not q:
+        raise HTTPException(status_code=400, detail="Empty query")
+
+    if req.mode == "keyword":
+        # Local and fast, and the corpus keeps growing, so not cached
+        papers = await search_keyword(q, req.limit)
+    elif req.mode == "fused":
+        papers = await cache.get_or_fetch(make_key(q, req.limit, req.mode), lambda: fetch_fused(q, req.limit))
+    else:
+        papers = await cache.get_or_fetch(make_key(q, req.limit), lambda: fetch_with_library(q, req.limit))
+
+    # Always a SearchResponse (can be empty); the papers were validated when built, so they skip response_model
+    return wire_response({"papers": dump_papers(papers)}, request)
 
+@app.get("/stats")
+async def stats():
+    return {
+        "cache": cache.stats(),
+        "library": await asyncio.to_thread(library.stats) if library else None,
+        "upstreams": upstream_stats(),
+    }
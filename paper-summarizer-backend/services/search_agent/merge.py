@@ -0,0 +1,84 @@
+# services/search_agent/merge.py
+import re
+from typing import Dict, List
+
+from common.schemas import Paper
+
+_VERSION = re.compile(r"v\d+$")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def paper_keys(p: Paper) -> List[str]:
+    """Identity keys for a paper: arXiv id (unversioned), DOI, normalized title and source id."""
+    ext = p.external_ids or {}
+    keys = []
+    arxiv_id = p.arxiv_id or ext.get("ArXiv")
+    if arxiv_id:
+        keys.append("arxiv:" + _VERSION.sub("", str(arxiv_id).lower()))
+    doi = ext.get("DOI")
+    if doi:
+        keys.append("doi:" + str(doi).lower())
+    if p.title:
+        title = _NON_ALNUM.sub(" ", p.title.lower()).strip()
+        if title:
+            keys.append("title:" + title)
+    if p.id:
+        keys.append("id:" + p.id)
+    return keys
+
+
+def fill_missing(kept: Paper, dup: Paper) -> Paper:
+    updates = {}
+    for field, value in dup.dict().items():
+        if value and not getattr(kept, field):
+            updates[field] = value
+    if dup.external_ids:
+        updates["external_ids"] = {**dup.external_ids, **(kept.external_ids or {})}
+    return kept.copy(update=updates) if updates else kept
+
+
+def merge_papers(*result_sets: List[Paper]) -> List[Paper]:
+    """
+    Merge result sets in priority order, dropping duplicates. A duplicate
+    only contributes fields the earlier copy is missing (e.g. an abstract).
+    """
+    merged: List[Paper] = []
+    index: Dict[str, int] = {}
+    for papers in result_sets:
+        for p in papers:
+            keys = paper_keys(p)
+            pos = next((index[k] for k in keys if k in index), None)
+            if pos is None:
+                pos = len(merged)
+                merged.append(p)
+            else:
+                merged[pos] = fill_missing(merged[pos], p)
+            for k in paper_keys(merged[pos]):
+                index.setdefault(k, pos)
+    return merged
+
+
+def reciprocal_rank_fusion(*rankings: List[Paper], k: int = 60) -> List[Paper]:
+    """
+    Fuse rankings by summing 1 / (k + rank) per paper, so papers ranked well
+    by several sources rise to the top. Duplicates merge as in `merge_papers`;
+    ties keep the order of the earlier ranking.
+    """
+    papers: List[Paper] = []
+    scores: List[float] = []
+    index: Dict[str, int] = {}
+    for ranking in rankings:
+        for rank, p in enumerate(ranking, start=1):
+            keys = paper_keys(p)
+            pos = next((index[key] for key in keys if key in index), None)
+            if pos is None:
+                pos = len(papers)
+                papers.append(p)
+                scores.append(0.0)
+            else:
+                papers[pos] = fill_missing(papers[pos], p)
+            scores[pos] += 1.0 / (k + rank)
+            for key in paper_keys(papers[pos]):
+                index.setdefault(key, pos)
+    order = sorted(range(len(papers)), key=lambda i: -scores[i])
+    return [papers[i] for i in order]
@@ -0,0 +1,196 @@
+# services/search_agent/store.py
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.schemas import Paper
+from .merge import fill_missing, paper_keys
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    paper_id TEXT,
+    title TEXT,
+    abstract TEXT,
+    authors TEXT,
+    year INTEGER,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL,
+    embedded INTEGER NOT NULL DEFAULT 0  -- 1 once the current content is in the vector index
+);
+CREATE TABLE IF NOT EXISTS paper_keys (
+    key TEXT PRIMARY KEY,
+    paper_rowid INTEGER NOT NULL
+);
+"""
+
+# BM25 keyword index over the papers table, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, authors,
+    content='papers', content_rowid='rowid',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, abstract, authors) VALUES (new.rowid, new.title, new.abstract, new.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, abstract, authors)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE OF title, abstract, authors ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, abstract, authors)
+    VALUES ('delete', old.rowid, old.title, old.abstract, old.authors);
+    INSERT INTO papers_fts (rowid, title, abstract, authors) VALUES (new.rowid, new.title, new.abstract, new.authors);
+END;
+"""
+
+# Rows whose vector still has to be added to the embedding index
+EMBEDDED_SCHEMA = """
+CREATE INDEX IF NOT EXISTS papers_unembedded ON papers (rowid) WHERE embedded = 0;
+"""
+
+# bm25() column weights: title, abstract, authors
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+class PaperStore:
+    """
+    SQLite store of every Paper the search agent has seen. Papers are
+    deduplicated on `merge.paper_keys` (arXiv id, DOI, title, source id), and
+    a re-seen paper only fills in fields the stored copy is missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(papers)")}
+        # Stores created before the flag existed: which rows are indexed is settled by
+        # `mark_indexed` against the index's rowids (see library.embed_pending)
+        self.needs_reconcile = "embedded" not in columns
+        if self.needs_reconcile:
+            self._db.execute("ALTER TABLE papers ADD COLUMN embedded INTEGER NOT NULL DEFAULT 0")
+        self._db.executescript(EMBEDDED_SCHEMA)
+        has_fts = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'papers_fts'").fetchone()
+        # older versions re-indexed on every UPDATE, including embedded-flag updates
+        self._db.execute("DROP TRIGGER IF EXISTS papers_fts_update")
+        self._db.executescript(FTS_SCHEMA)
+        if not has_fts:
+            # index papers stored before the keyword index existed
+            self._db.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row_values(p: Paper) -> tuple:
+        return (p.id, p.title, p.abstract, "; ".join(p.authors or []), p.year, json.dumps(p.dict()), time.time())
+
+    def _upsert(self, p: Paper) -> Tuple[int, bool, bool]:
+        """Returns (rowid, inserted, changed)."""
+        keys = paper_keys(p)
+        if not keys:
+            return 0, False, False
+        placeholders = ",".join("?" * len(keys))
+        row = self._db.execute(
+            f"SELECT paper_rowid FROM paper_keys WHERE key IN ({placeholders}) LIMIT 1", keys
+        ).fetchone()
+        if row:
+            rowid = row[0]
+            (data,) = self._db.execute("SELECT data FROM papers WHERE rowid = ?", (rowid,)).fetchone()
+            stored = Paper(**json.loads(data))
+            merged = fill_missing(stored, p)
+            changed = merged.dict() != stored.dict()
+            if changed:
+                self._db.execute(
+                    "UPDATE papers SET paper_id=?, title=?, abstract=?, authors=?, year=?, data=?, updated=?, embedded=0 "
+                    "WHERE rowid=?",
+                    self._row_values(merged) + (rowid,),
+                )
+            keys = paper_keys(merged)
+            inserted = False
+        else:
+            cur = self._db.execute(
+                "INSERT INTO papers (paper_id, title, abstract, authors, year, data, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._row_values(p),
+            )
+            rowid, inserted, changed = cur.lastrowid, True, True
+        self._db.executemany(
+            "INSERT OR IGNORE INTO paper_keys (key, paper_rowid) VALUES (?, ?)", [(k, rowid) for k in keys]
+        )
+        return rowid, inserted, changed
+
+    def upsert_many(self, papers: Iterable[Paper]) -> List[Tuple[int, bool, bool]]:
+        """Upsert in one transaction; returns (rowid, inserted, changed) per paper (rowid 0 = skipped)."""
+        with self._lock, self._db:
+            return [self._upsert(p) for p in papers]
+
+    def get_many(self, rowids: List[int]) -> Dict[int, Paper]:
+        if not rowids:
+            return {}
+        with self._lock:
+            placeholders = ",".join("?" * len(rowids))
+            rows = self._db.execute(
+                f"SELECT rowid, data FROM papers WHERE rowid IN ({placeholders})", list(rowids)
+            ).fetchall()
+        return {rowid: Paper(**json.loads(data)) for rowid, data in rows}
+
+    def unembedded(self, rowids: Optional[List[int]] = None, limit: int = 1000) -> List[Tuple[int, float, Paper]]:
+        """(rowid, updated, paper) of rows not yet in the vector index, optionally only among `rowids`."""
+        with self._lock:
+            if rowids is None:
+                rows = self._db.execute(
+                    "SELECT rowid, updated, data FROM papers WHERE embedded = 0 ORDER BY rowid LIMIT ?", (limit,)
+                ).fetchall()
+            elif rowids:
+                placeholders = ",".join("?" * len(rowids))
+                rows = self._db.execute(
+                    f"SELECT rowid, updated, data FROM papers WHERE embedded = 0 AND rowid IN ({placeholders})",
+                    list(rowids),
+                ).fetchall()
+            else:
+                rows = []
+        return [(rowid, updated, Paper(**json.loads(data))) for rowid, updated, data in rows]
+
+    def mark_embedded(self, rows: List[Tuple[int, float]]):
+        """Flag (rowid, updated) pairs as indexed; a row updated since it was embedded stays pending."""
+        with self._lock, self._db:
+            self._db.executemany("UPDATE papers SET embedded = 1 WHERE rowid = ? AND updated = ?", rows)
+
+    def mark_indexed(self, rowids: Iterable[int]):
+        """One-off migration: flag every row that already has a vector in the index."""
+        rowids = list(rowids)
+        with self._lock, self._db:
+            for start in range(0, len(rowids), 500):
+                chunk = rowids[start:start + 500]
+                self._db.execute(
+                    f"UPDATE papers SET embedded = 1 WHERE rowid IN ({','.join('?' * len(chunk))})", chunk
+                )
+        self.needs_reconcile = False
+
+    def keyword_search(self, query: str, limit: int) -> List[Tuple[Paper, float]]:
+        """BM25 over title, abstract and authors; any query term may match, papers matching more rank higher."""
+        terms = [t.replace('"', '""') for t in query.split()]
+        if not terms or limit <= 0:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)  # quoted, so user input is never FTS syntax
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT papers.data, bm25(papers_fts, ?, ?, ?) AS score FROM papers_fts "
+                "JOIN papers ON papers.rowid = papers_fts.rowid "
+                "WHERE papers_fts MATCH ? ORDER BY score LIMIT ?",
+                BM25_WEIGHTS + (match, limit),
+            ).fetchall()
+        # bm25() is lower-is-better; flip it so higher scores are better like the embedding index
+        return [(Paper(**json.loads(data)), -score) for data, score in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,105 @@
+# services/summarizer_agent/backends.py
+import os
+
+from common.config import settings
+
+
+def configure_torch_threads():
+    import torch
+    if settings.SUMMARIZER_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(settings.SUMMARIZER_INTRA_OP_THREADS)
+    if settings.SUMMARIZER_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.SUMMARIZER_INTER_OP_THREADS)
+        except RuntimeError:
+            # can only be set once per process, before any inter-op work started
+            pass
+
+
+def hub_kwargs() -> dict:
+    """from_pretrained options: a local cache dir, and optionally no network at all."""
+    kwargs = {}
+    if settings.SUMMARIZER_MODEL_CACHE_DIR:
+        kwargs["cache_dir"] = settings.SUMMARIZER_MODEL_CACHE_DIR
+    if settings.SUMMARIZER_LOCAL_FILES_ONLY:
+        kwargs["local_files_only"] = True
+    return kwargs
+
+
+def _load_pytorch(model_name: str):
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    configure_torch_threads()
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name, **hub_kwargs())
+    tokenizer = AutoTokenizer.from_pretrained(model_name, **hub_kwargs())
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+def _load_quantized(model_name: str):
+    """Dynamic int8 quantization of every nn.Linear: weights int8, activations quantized on the fly."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    configure_torch_threads()
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name, **hub_kwargs())
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, **hub_kwargs())
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+def _load_onnx(model_name: str):
+    """ONNX Runtime model, exported once into SUMMARIZER_ONNX_DIR and reused afterwards."""
+    try:
+        import onnxruntime as ort
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise RuntimeError("SUMMARIZER_BACKEND=onnx needs `pip install optimum[onnxruntime]`") from e
+    from transformers import AutoTokenizer, pipeline
+
+    options = ort.SessionOptions()
+    if settings.SUMMARIZER_INTRA_OP_THREADS > 0:
+        options.intra_op_num_threads = settings.SUMMARIZER_INTRA_OP_THREADS
+    if settings.SUMMARIZER_INTER_OP_THREADS > 0:
+        options.inter_op_num_threads = settings.SUMMARIZER_INTER_OP_THREADS
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    export_dir = settings.SUMMARIZER_ONNX_DIR
+    if export_dir and os.path.isdir(export_dir) and os.listdir(export_dir):
+        model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, session_options=options)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, session_options=options, **hub_kwargs())
+        tokenizer = AutoTokenizer.from_pretrained(model_name, **hub_kwargs())
+        if export_dir:
+            model.save_pretrained(export_dir)
+            tokenizer.save_pretrained(export_dir)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+def _load_stub(model_name: str):
+    """No model at all: for load tests of the service itself (see benchmarks/)."""
+    from .stub import StubSummarizer
+    return StubSummarizer(settings.SUMMARIZER_STUB_BATCH_MS, settings.SUMMARIZER_STUB_ITEM_MS)
+
+
+_LOADERS = {
+    "pytorch": _load_pytorch,
+    "quantized": _load_quantized,
+    "onnx": _load_onnx,
+    "stub": _load_stub,
+}
+BACKENDS = tuple(_LOADERS)
+
+
+def load_summarizer(backend: str | None = None, model_name: str | None = None):
+    """Return a transformers summarization pipeline running on the configured backend."""
+    backend = (backend or settings.SUMMARIZER_BACKEND).lower()
+    if backend not in _LOADERS:
+        raise ValueError(f"Unknown SUMMARIZER_BACKEND {backend!r}; expected one of {', '.join(_LOADERS)}")
+    return _LOADERS[backend](model_name or settings.SUMMARIZER_MODEL)
+
+
+def model_id(backend: str | None = None) -> str:
+    """Identity used in summary cache keys: different backends may word summaries differently."""
+    backend = (backend or settings.SUMMARIZER_BACKEND).lower()
+    if backend == "pytorch":
+        return settings.SUMMARIZER_MODEL
+    return f"{settings.SUMMARIZER_MODEL}@{backend}"
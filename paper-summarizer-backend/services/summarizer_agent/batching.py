@@ -0,0 +1,165 @@
+# services/summarizer_agent/batching.py
+import asyncio
+import math
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# run_batch(texts, max_length, min_length) -> one summary per text; must not block the event loop
+BatchRunner = Callable[[List[str], int, int], Awaitable[List[str]]]
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the summarizer is already at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Summarizer queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Job:
+    text: str
+    max_length: int
+    min_length: int
+    future: asyncio.Future
+
+
+class MicroBatcher:
+    """
+    Collects concurrent summarize calls for up to `max_wait_ms` (or until
+    `max_batch_size` jobs are queued) and runs them through the model as one
+    padded batch. Up to `concurrency` batches run at once (one per model
+    replica); while all are busy, new jobs keep queueing into bigger batches.
+    At most `max_queue` jobs may wait (0 = unbounded), beyond that callers get
+    `Overloaded` straight away.
+    """
+
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int = 8, max_wait_ms: int = 10,
+                 concurrency: int = 1, max_queue: int = 0):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.rejected = 0
+        self.in_flight_batches = 0
+        self._batch_seconds = 1.0  # EWMA of batch wall time, for Retry-After
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._worker = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._running):
+            task.cancel()
+        # fail anything still waiting so callers don't hang on shutdown
+        while self._queue and not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Summarizer shutting down"))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def retry_after(self) -> int:
+        batches_ahead = math.ceil((self.queue_depth + 1) / self.max_batch_size)
+        return max(1, math.ceil(batches_ahead * self._batch_seconds / self.concurrency))
+
+    def admit(self, n: int = 1):
+        """Reject up front if `n` more jobs would overflow the queue."""
+        if self.max_queue and self.queue_depth + n > self.max_queue:
+            self.rejected += n
+            raise Overloaded(self.retry_after())
+
+    async def submit(self, text: str, max_length: int, min_length: int) -> str:
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher not started")
+        self.admit()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Job(text, max_length, min_length, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "in_flight_batches": self.in_flight_batches,
+            "concurrency": self.concurrency,
+            "rejected": self.rejected,
+            "avg_batch_seconds": self._batch_seconds,
+        }
+
+    async def _collect(self) -> List[_Job]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # take whatever is already queued before waiting on the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, jobs: List[_Job], max_length: int, min_length: int):
+        jobs = [j for j in jobs if not j.future.done()]  # caller went away
+        if not jobs:
+            return
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            summaries = await self.run_batch([j.text for j in jobs], max_length, min_length)
+        except Exception as e:
+            for j in jobs:
+                if not j.future.done():
+                    j.future.set_exception(e)
+            return
+        self._batch_seconds = 0.8 * self._batch_seconds + 0.2 * (loop.time() - started)
+        for j, summary in zip(jobs, summaries):
+            if not j.future.done():
+                j.future.set_result(summary)
+
+    async def _run_batch(self, batch: List[_Job]):
+        self.in_flight_batches += 1
+        try:
+            # generation params are per call, so only jobs that share them can be padded together
+            groups: Dict[Tuple[int, int], List[_Job]] = {}
+            for job in batch:
+                groups.setdefault((job.max_length, job.min_length), []).append(job)
+            for (max_length, min_length), jobs in groups.items():
+                await self._run(jobs, max_length, min_length)
+        finally:
+            self.in_flight_batches -= 1
+            self._slots.release()
+
+    async def _loop(self):
+        while True:
+            # wait for a free replica first, so the queue keeps filling the next batch meanwhile
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
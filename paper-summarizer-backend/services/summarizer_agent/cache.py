@@ -0,0 +1,140 @@
+# services/summarizer_agent/cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from common.cache import LRUCache
+
+
+def make_key(model: str, text: str, style: Optional[str], max_tokens: Optional[int], min_length: int) -> str:
+    """Content address of one summary: everything that changes the model output."""
+    raw = json.dumps([model, text, style, max_tokens, min_length], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: a bounded in-memory LRU in front of a SQLite
+    table that survives restarts. Disk hits are promoted into memory.
+
+    Only the memory tier is touched on the event loop. Disk reads run in a
+    thread, and writes are buffered and committed in batches every
+    `flush_ms` by a background task (write-behind), so there is no fsync per
+    summary on the loop.
+    """
+
+    def __init__(self, max_entries: int = 2048, path: Optional[str] = None, flush_ms: int = 200):
+        self.flush_ms = flush_ms
+        self._mem = LRUCache(max_entries, name="summary")
+        self._lock = threading.Lock()  # memory tier and pending writes
+        self._db_lock = threading.Lock()  # the SQLite connection, used from worker threads
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self.disk_writes = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._mem.get(key, count=False)
+            if summary is not None:
+                return summary
+            pending = self._pending.get(key)
+            return pending[0] if pending else None
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _disk_write(self, rows: List[Tuple[str, str, float]]):
+        with self._db_lock:
+            if self._db is None:
+                return
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO summaries (key, summary, created) VALUES (?, ?, ?)", rows)
+
+    async def get(self, key: str) -> Optional[str]:
+        summary = self._memory_get(key)
+        if summary is not None:
+            self._mem.record("hit")
+            return summary
+        if self._db is not None:
+            summary = await asyncio.to_thread(self._disk_get, key)
+            if summary is not None:
+                with self._lock:
+                    self._mem.put(key, summary)
+                self._mem.record("disk_hit")
+                return summary
+        self._mem.record("miss")
+        return None
+
+    def put(self, key: str, summary: str):
+        with self._lock:
+            self._mem.put(key, summary)
+            if self._db is not None:
+                self._pending[key] = (summary, time.time())
+
+    def _take_pending(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(key, summary, created) for key, (summary, created) in pending.items()]
+
+    async def flush(self):
+        rows = self._take_pending()
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(self._disk_write, rows)
+            self.disk_writes += len(rows)
+        except Exception as e:
+            print("Summary cache write error:", e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_ms / 1000)
+            await self.flush()
+
+    def start(self):
+        if self._db is not None and self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the write-behind task, write what is still buffered and close the database."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        self.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._mem.stats(),
+                "disk_hits": self._mem.lookups.get("disk_hit", 0),
+                "persistent": self._db is not None,
+                "pending_writes": len(self._pending),
+                "disk_writes": self.disk_writes,
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,50 @@
+# services/summarizer_agent/chunking.py
+import zlib
+from typing import List, Tuple
+
+_SENTENCE_END = (".", "?", "!", "\n")
+# roughly one boundary in ANCHOR_EVERY is an anchor
+ANCHOR_EVERY = 4
+
+
+def _is_anchor(text: str) -> bool:
+    # crc32 rather than hash(): chunk boundaries (and so chunk cache keys) must be stable across processes
+    return zlib.crc32(text.encode("utf-8")) % ANCHOR_EVERY == 0
+
+
+def split_windows(text: str, tokenizer, window: int, overlap: int) -> List[str]:
+    """
+    Tokenize `text` once and cut it into overlapping windows of at most
+    `window` tokens, cutting at sentence ends where possible.
+
+    Cuts are content-defined: within the back half of each window the first
+    "anchor" sentence end (chosen by a hash of the sentence) wins, so after an
+    edit the chunking resynchronizes at the next anchor and unchanged chunks
+    keep their exact text (and cache entries).
+    """
+    enc = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets: List[Tuple[int, int]] = enc["offset_mapping"]
+    n = len(offsets)
+    if n <= window:
+        return [text]
+
+    # token index just after each sentence-ending token
+    boundaries = [
+        i + 1 for i, (s, e) in enumerate(offsets)
+        if text[s:e].rstrip().endswith(_SENTENCE_END) or text[e:e + 1] == "\n"
+    ]
+
+    chunks = []
+    start = 0
+    while start < n:
+        end = min(start + window, n)
+        if end < n:
+            candidates = [b for b in boundaries if start + window // 2 <= b <= end]
+            if candidates:
+                anchors = [b for b in candidates if _is_anchor(text[offsets[max(start, b - 8)][0]:offsets[b - 1][1]])]
+                end = anchors[0] if anchors else candidates[-1]
+        chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
@@ -1,9 +1,145 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from common.schemas import SummarizeRequest, SummarizeResponse
-from transformers import pipeline
+from common.schemas import SummarizeRequest, SummarizeResponse, SummarizeBatchRequest, SummarizeBatchResponse, SummarizeBatchResult
+from common.config import settings
+from common.telemetry import install_metrics, MODEL_INFERENCE, BATCH_SIZE, QUEUE_DEPTH, REPLICAS_BUSY, REJECTED
+from .batching import MicroBatcher, Overloaded
+from .cache import SummaryCache, make_key
+from .chunking import split_windows
+from .backends import load_summarizer, model_id
+from .replicas import create_pool
+from .model import ModelHolder
 
-app = FastAPI(title="Summarizer Agent")
+MODEL_ID = model_id()
+
+# Optional process-pool replicas, created once the model is loaded so workers
+# can fork from it; None means inference runs in a thread of this process
+pool = None
+
+WARMUP_TEXTS = [
+    "Warm-up request so the first real summary doesn't pay for lazy kernel and allocator initialisation.",
+    "A second short text so the warm-up runs a padded batch of two.",
+]
+
+async def after_model_load(model):
+    global pool
+    pool = create_pool(settings.SUMMARIZER_REPLICAS, settings.SUMMARIZER_BACKEND, model)
+    if pool is not None:
+        await pool.start()
+    if settings.SUMMARIZER_WARMUP:
+        if pool is not None:
+            await pool.run(WARMUP_TEXTS, 40, 5)
+        else:
+            await asyncio.to_thread(run_batch, WARMUP_TEXTS, 40, 5, model)
+
+# Load BART model on the configured backend (pytorch, quantized, onnx) off the event loop
+model_holder = ModelHolder(load_summarizer, after_load=after_model_load)
+
+def run_batch(texts, max_length: int, min_length: int, summarizer=None):
+    summarizer = summarizer or model_holder.model
+    outputs = summarizer(
+        texts,
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        truncation=True,
+        batch_size=len(texts),
+    )
+    return [o["summary_text"] for o in outputs]
+
+async def run_model(texts, max_length: int, min_length: int):
+    await model_holder.get()
+    BATCH_SIZE.observe(len(texts))
+    started = time.perf_counter()
+    REPLICAS_BUSY.inc()
+    try:
+        if pool is not None:
+            return await pool.run(texts, max_length, min_length)
+        return await asyncio.to_thread(run_batch, texts, max_length, min_length)
+    finally:
+        REPLICAS_BUSY.dec()
+        MODEL_INFERENCE.observe(time.perf_counter() - started)
+
+batcher = MicroBatcher(
+    run_model,
+    max_batch_size=settings.SUMMARIZER_MAX_BATCH_SIZE,
+    max_wait_ms=settings.SUMMARIZER_MAX_WAIT_MS,
+    concurrency=settings.SUMMARIZER_CONCURRENCY or max(1, settings.SUMMARIZER_REPLICAS),
+    max_queue=settings.SUMMARIZER_MAX_QUEUE,
+)
+QUEUE_DEPTH.set_function(lambda: batcher.queue_depth)
+
+cache = SummaryCache(
+    max_entries=settings.SUMMARY_CACHE_SIZE,
+    path=settings.SUMMARY_CACHE_PATH or None,
+    flush_ms=settings.SUMMARY_CACHE_FLUSH_MS,
+)
+
+async def _summarize_cached(key: str, text: str, max_tokens: int | None, min_length: int) -> str:
+    summary = await batcher.submit(text, max_length=max_tokens, min_length=min_length)
+    if summary:
+        cache.put(key, summary)
+    return summary
+
+async def summarize_text(text: str, style: str | None, max_tokens: int | None, min_length: int = 30) -> str:
+    key = make_key(MODEL_ID, text, style, max_tokens, min_length)
+    summary = await cache.get(key)
+    if summary is not None:
+        return summary
+    return await _summarize_cached(key, text, max_tokens, min_length)
+
+async def summarize_document(text: str, style: str | None, max_tokens: int | None, min_length: int = 30, depth: int = 0) -> str:
+    """
+    Map-reduce summary for inputs longer than the model's context: split into
+    overlapping token windows, summarize all chunks as one batch (each chunk
+    cached on its own), then summarize the joined chunk summaries again
+    until they fit.
+    """
+    # look the whole text up first: a hit needs neither the model nor the tokenizer
+    key = make_key(MODEL_ID, text, style, max_tokens, min_length)
+    summary = await cache.get(key)
+    if summary is not None:
+        return summary
+
+    # a token covers at least one character, so shorter texts always fit
+    if len(text) > settings.SUMMARIZER_CHUNK_TOKENS and depth < settings.SUMMARIZER_MAX_REDUCE_DEPTH:
+        summarizer = await model_holder.get()
+        chunks = await asyncio.to_thread(
+            split_windows, text, summarizer.tokenizer,
+            settings.SUMMARIZER_CHUNK_TOKENS, settings.SUMMARIZER_CHUNK_OVERLAP,
+        )
+        if len(chunks) > 1:
+            partials = await asyncio.gather(*[summarize_text(c, style, max_tokens, min_length) for c in chunks])
+            summary = await summarize_document(" ".join(p for p in partials if p), style, max_tokens, min_length, depth + 1)
+            if summary:
+                cache.put(key, summary)
+            return summary
+
+    # fits already, or give up reducing and let the pipeline truncate
+    return await _summarize_cached(key, text, max_tokens, min_length)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # eager: don't accept traffic until loaded; background: bind now, load meanwhile;
+    # lazy: load on the first summarize request
+    if settings.SUMMARIZER_LOAD_MODE == "eager":
+        await model_holder.get()
+    elif settings.SUMMARIZER_LOAD_MODE == "background":
+        model_holder.start_loading()
+    await batcher.start()
+    cache.start()
+    yield
+    await batcher.stop()
+    if pool is not None:
+        pool.shutdown()
+    await cache.stop()
+
+app = FastAPI(title="Summarizer Agent", lifespan=lifespan)
+install_metrics(app, "summarizer_agent")
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,20 +149,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load BART model
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+def overloaded(e: Overloaded):
+    REJECTED.inc()
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def make_highlights(summary: str):
+    # Generate highlights (simple heuristic or model-based)
+    # For simplicity, split summary into sentences and take first 3 as highlights
+    sentences = summary.split(". ")
+    return [s.strip() + "." for s in sentences[:3] if s.strip()]
 
 @app.post("/summarize", response_model=SummarizeResponse)
 async def summarize(req: SummarizeRequest):
     try:
-        # Generate summary
-        summary = summarizer(req.text, max_length=req.max_tokens, min_length=30, do_sample=False)[0]["summary_text"]
-        
-        # Generate highlights (simple heuristic or model-based)
-        # For simplicity, split summary into sentences and take first 3 as highlights
-        sentences = summary.split(". ")
-        highlights = [s.strip() + "." for s in sentences[:3] if s.strip()]
-        
-        return SummarizeResponse(summary=summary, highlights=highlights)
+        # Generate summary (batched with any concurrent requests)
+        summary = await summarize_document(req.text, req.style, req.max_tokens)
+        return SummarizeResponse(summary=summary, highlights=make_highlights(summary))
+    except Overloaded as e:
+        raise overloaded(e)
     except Exception as e:
-        return SummarizeResponse(summary="", highlights=[], error=str(e))
\ No newline at end of file
+        return SummarizeResponse(summary="", highlights=[], error=str(e))
+
+@app.post("/summarize/batch", response_model=SummarizeBatchResponse)
+async def summarize_batch(req: SummarizeBatchRequest):
+    try:
+        batcher.admit(len(req.items))
+    except Overloaded as e:
+        raise overloaded(e)
+    # All items land in the batcher queue at once, so they fill whole model batches
+    outputs = await asyncio.gather(
+        *[summarize_document(item.text, item.style, item.max_tokens) for item in req.items],
+        return_exceptions=True,
+    )
+    results = []
+    for item, out in zip(req.items, outputs):
+        if isinstance(out, Exception):
+            results.append(SummarizeBatchResult(id=item.id, summary="", highlights=[], error=str(out)))
+        else:
+            results.append(SummarizeBatchResult(id=item.id, summary=out, highlights=make_highlights(out)))
+    return SummarizeBatchResponse(results=results)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "cache": cache.stats(),
+        "batcher": batcher.stats(),
+        "replicas": pool.stats() if pool else None,
+    }
+
+@app.get("/healthz")
+async def healthz():
+    # process is up and serving; says nothing about the model
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    body = {"status": model_holder.status, "load_seconds": model_holder.load_seconds, "error": model_holder.error}
+    return JSONResponse(body, status_code=200 if model_holder.ready else 503)
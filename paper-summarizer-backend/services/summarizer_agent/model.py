@@ -0,0 +1,59 @@
+# services/summarizer_agent/model.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+class ModelHolder:
+    """
+    Owns the summarizer model and loads it off the event loop, once.
+    `load` is a blocking loader (run in a thread); `after_load` is an optional
+    coroutine run before the model is reported ready (replica start-up, warm-up).
+    """
+
+    def __init__(self, load: Callable[[], Any], after_load: Optional[Callable[[Any], Awaitable[None]]] = None):
+        self._load = load
+        self._after_load = after_load
+        self.model = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    @property
+    def status(self) -> str:
+        if self.ready:
+            return "ready"
+        if self.error:
+            return "failed"
+        return "loading" if self._task else "not_loaded"
+
+    def start_loading(self) -> asyncio.Task:
+        # a failed load is retried by the next caller
+        if self._task is None or (self._task.done() and not self.ready):
+            self.error = None
+            self._task = asyncio.create_task(self._run())
+            # background loads may never be awaited; the error is kept in self.error
+            self._task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._task
+
+    async def _run(self):
+        started = time.perf_counter()
+        try:
+            model = await asyncio.to_thread(self._load)
+            if self._after_load:
+                await self._after_load(model)
+        except Exception as e:
+            self.error = str(e) or e.__class__.__name__
+            print("Summarizer model load failed:", e)
+            raise
+        self.load_seconds = time.perf_counter() - started
+        self.model = model
+
+    async def get(self):
+        if self.model is None:
+            await asyncio.shield(self.start_loading())
+        return self.model
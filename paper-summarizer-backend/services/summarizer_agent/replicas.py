@@ -0,0 +1,98 @@
+# services/summarizer_agent/replicas.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from .backends import configure_torch_threads, load_summarizer
+
+# The model inside each worker process. When the pool forks, workers inherit
+# the parent's already-loaded model and share its weight pages copy-on-write.
+_replica = None
+
+
+def share_model(summarizer):
+    global _replica
+    _replica = summarizer
+
+
+def _init_replica(backend: str):
+    global _replica
+    if _replica is None:  # spawned, not forked: load our own copy
+        _replica = load_summarizer(backend)
+    else:
+        configure_torch_threads()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_in_replica(texts: List[str], max_length: int, min_length: int) -> List[str]:
+    outputs = _replica(
+        texts,
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        truncation=True,
+        batch_size=len(texts),
+    )
+    return [o["summary_text"] for o in outputs]
+
+
+class ReplicaPool:
+    """N summarizer model replicas in worker processes, one batch per replica at a time."""
+
+    def __init__(self, replicas: int, backend: str):
+        self.replicas = max(1, replicas)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.replicas,
+            mp_context=context,
+            initializer=_init_replica,
+            initargs=(backend,),
+        )
+        self.busy = 0
+        self.batches = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+
+    async def start(self):
+        # fork every worker now, before the parent runs any inference threads
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, _ping) for _ in range(self.replicas)])
+
+    async def run(self, texts: List[str], max_length: int, min_length: int) -> List[str]:
+        loop = asyncio.get_running_loop()
+        self.busy += 1
+        started = time.monotonic()
+        try:
+            return await loop.run_in_executor(self._executor, _run_in_replica, texts, max_length, min_length)
+        finally:
+            self.busy -= 1
+            self.batches += 1
+            self._busy_seconds += time.monotonic() - started
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "replicas": self.replicas,
+            "busy": self.busy,
+            "batches": self.batches,
+            # fraction of total replica time spent running batches since start
+            "utilization": self._busy_seconds / (elapsed * self.replicas),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_pool(replicas: int, backend: str, summarizer=None) -> Optional[ReplicaPool]:
+    if replicas <= 0:
+        return None
+    if summarizer is not None:
+        share_model(summarizer)
+    return ReplicaPool(replicas, backend)
@@ -0,0 +1,35 @@
+# services/summarizer_agent/stub.py
+import re
+import time
+from typing import List, Union
+
+_TOKEN = re.compile(r"\S+")
+
+
+class StubTokenizer:
+    """Whitespace tokenizer covering the part of the Hugging Face tokenizer API the agent uses."""
+
+    def __call__(self, text: str, add_special_tokens: bool = True, return_offsets_mapping: bool = False, **kwargs):
+        spans = [m.span() for m in _TOKEN.finditer(text)]
+        enc = {"input_ids": list(range(len(spans)))}
+        if return_offsets_mapping:
+            enc["offset_mapping"] = spans
+        return enc
+
+
+class StubSummarizer:
+    """
+    Drop-in for the transformers summarization pipeline: returns the first
+    `max_length` words of each text after sleeping `batch_ms + item_ms * len(texts)`,
+    so batching and backpressure behave as with a real model, minus the model.
+    """
+
+    def __init__(self, batch_ms: float = 20, item_ms: float = 5):
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, texts: Union[str, List[str]], max_length: int = 142, min_length: int = 0, **kwargs):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        time.sleep((self.batch_ms + self.item_ms * len(texts)) / 1000)
+        return [{"summary_text": " ".join(t.split()[:max_length])} for t in texts]